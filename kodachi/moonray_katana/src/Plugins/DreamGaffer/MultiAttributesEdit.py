@@ -276,6 +276,29 @@ def renameLocation(self, location, newLocation):
     if locationParam:
         locationParam.getChild("location_dwa").setValue(newLocation, 0)
 
+def renameLocations(self, renames):
+    # renames is a list of (location, newLocation), the edits are parsed
+    # and written back once for the whole list
+    for paramName in ["edits", "muteSolo"]:
+        editsValue = self.getParameter(paramName).getValue(0)
+        if editsValue == "":
+            continue
+        editDict = ast.literal_eval(editsValue)
+        changed = False
+        for location, newLocation in renames:
+            if not editDict.get(location):
+                continue
+            editDict[newLocation] = editDict.pop(location)
+            changed = True
+        if changed:
+            self.getParameter(paramName).setValue(str(editDict), 0)
+
+    users = self.getParameter("users")
+    for location, newLocation in renames:
+        locationParam = users.getChild(location.replace("/", "_"))
+        if locationParam:
+            locationParam.getChild("location_dwa").setValue(newLocation, 0)
+
 
 def removeLocation(self, location):
     for paramName in ["edits", "muteSolo"]:
@@ -490,6 +513,7 @@ nb.setCustomMethod('setXformWithMatrix', setXformWithMatrix)
 
 
 nb.setCustomMethod('renameLocation', renameLocation)
+nb.setCustomMethod('renameLocations', renameLocations)
 nb.setCustomMethod('duplicateLocation', duplicateLocation)
 nb.setCustomMethod('removeLocation', removeLocation)
 nb.setCustomMethod('getSparseEditsForLocation', getSparseEditsForLocation)
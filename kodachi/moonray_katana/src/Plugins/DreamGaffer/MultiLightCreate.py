@@ -22,27 +22,41 @@ def buildOpChain(self, interface):
     interface.setMinRequiredInputs(0)
     frameTime = interface.getFrameTime()
     topLocation = self.getParameter("topLocation").getValue(0)
-    locationList = self.getListFromParam("locations", frameTime)
-    trans = self.getListFromParam("translate", frameTime)
-    rotate = self.getListFromParam("rotate", frameTime)
-    scale = self.getListFromParam("scale", frameTime)
-    material = self.getListFromParam("material", frameTime)
+    locationList = self.getListFromParam("locations", frameTime, interface)
+    if not any(locationList):
+        # no locations yet (or only removed/reserved entries)
+        return
+    trans = self.getListFromParam("translate", frameTime, interface)
+    rotate = self.getListFromParam("rotate", frameTime, interface)
+    scale = self.getListFromParam("scale", frameTime, interface)
+    material = self.getListFromParam("material", frameTime, interface)
     materialEditNodeName = self.getParent().getMaterialEditNode().getName()
+
+    # attributes shared by every location are built once
+    typeAttr = FnAttribute.StringAttribute("light")
+    xformExclusiveToAttr = FnAttribute.StringAttribute(self.getName())
+    materialExclusiveToAttr = FnAttribute.StringAttribute(materialEditNodeName)
+    previewColorAttr = FnAttribute.FloatAttribute([1, 1, 0])
+
     # set attr: material.moonrayLightShader : SpotLight
     sscb = FnGeolibServices.OpArgsBuilders.StaticSceneCreate()
     locationPathList = []
-    for i, loc in enumerate(locationList):
-        locationPath = topLocation + "/" + loc
+    locationPaths = SharedFunc.getLocationPaths(topLocation, locationList)
+    for i, locationPath in enumerate(locationPaths):
+        if locationPath is None:
+            # removed or reserved entry
+            continue
         locationPathList.append(locationPath)
-        sscb.setAttrAtLocation(locationPath, "xform.interactive.translate", FnAttribute.DoubleAttribute([trans[i*3], trans[i*3+1], trans[i*3+2]]))
-        sscb.setAttrAtLocation(locationPath, "xform.interactive.rotateZ", FnAttribute.DoubleAttribute([rotate[i*3+2], 0, 0, 1]))
-        sscb.setAttrAtLocation(locationPath, "xform.interactive.rotateY", FnAttribute.DoubleAttribute([rotate[i*3+1], 0, 1, 0]))
-        sscb.setAttrAtLocation(locationPath, "xform.interactive.rotateX", FnAttribute.DoubleAttribute([rotate[i*3], 1, 0, 0]))
-        sscb.setAttrAtLocation(locationPath, "xform.interactive.scale", FnAttribute.DoubleAttribute([scale[i*3], scale[i*3+1], scale[i*3+2]]))
-        sscb.setAttrAtLocation(locationPath, "type", FnAttribute.StringAttribute("light"))
-        sscb.setAttrAtLocation(locationPath, "attributeEditor.xform.exclusiveTo", FnAttribute.StringAttribute(self.getName()))
-        sscb.setAttrAtLocation(locationPath, "attributeEditor.material.exclusiveTo", FnAttribute.StringAttribute(materialEditNodeName))
-        sscb.setAttrAtLocation(locationPath, "geometry.previewColor", FnAttribute.FloatAttribute([1, 1, 0]))
+        j = i*3
+        sscb.setAttrAtLocation(locationPath, "xform.interactive.translate", FnAttribute.DoubleAttribute(trans[j:j+3]))
+        sscb.setAttrAtLocation(locationPath, "xform.interactive.rotateZ", FnAttribute.DoubleAttribute([rotate[j+2]] + SharedFunc.Z_AXIS))
+        sscb.setAttrAtLocation(locationPath, "xform.interactive.rotateY", FnAttribute.DoubleAttribute([rotate[j+1]] + SharedFunc.Y_AXIS))
+        sscb.setAttrAtLocation(locationPath, "xform.interactive.rotateX", FnAttribute.DoubleAttribute([rotate[j]] + SharedFunc.X_AXIS))
+        sscb.setAttrAtLocation(locationPath, "xform.interactive.scale", FnAttribute.DoubleAttribute(scale[j:j+3]))
+        sscb.setAttrAtLocation(locationPath, "type", typeAttr)
+        sscb.setAttrAtLocation(locationPath, "attributeEditor.xform.exclusiveTo", xformExclusiveToAttr)
+        sscb.setAttrAtLocation(locationPath, "attributeEditor.material.exclusiveTo", materialExclusiveToAttr)
+        sscb.setAttrAtLocation(locationPath, "geometry.previewColor", previewColorAttr)
         mat = material[i]
         if mat!= "":
             if mat.startswith("../"):
@@ -84,18 +98,19 @@ def setParamAtIndex(self, param, index):
         dstParam = self.getParameter(paramName).getChildByIndex(index*3+axis.index(name))
         SharedFunc.copyParamToParam(param, dstParam)
 
-def increaseArrays(self):
+def increaseArrays(self, count=1):
     for paramName in ["locations", "material", "order"]:
         param = self.getParameter(paramName)
         num = param.getNumChildren()
-        param.resizeArray(num + 1)
+        param.resizeArray(num + count)
     
-    self.initXformParam()
+    self.initXformParam(count)
 
 
 def removeLocationAtIndex(self, index):
     # reset values..
     self.getParameter("locations").getChildByIndex(index).setValue("", 0)
+    SharedFunc.clearLocationIndexCache(self)
     self.getParameter("material").getChildByIndex(index).setValue("",0)
     
     for paramName in ["translate", "rotate", "scale"]:
@@ -109,14 +124,12 @@ def removeLocationAtIndex(self, index):
 
 def duplicateLocation(self, srcIndex, dstIndex, dstLocation):
     self.addLocationAtIndex(dstLocation, dstIndex)
-    SharedFunc.copyParamToParam(self.getParameter("material").getChildByIndex(srcIndex), 
-                                self.getParameter("material").getChildByIndex(dstIndex))
+    materialParam = self.getParameter("material")
+    SharedFunc.copyParamToParam(materialParam.getChildByIndex(srcIndex), materialParam.getChildByIndex(dstIndex))
     
     for paramName in ["translate", "rotate", "scale"]:
         param = self.getParameter(paramName)
-        SharedFunc.copyParamToParam(param.getChildByIndex(srcIndex*3), param.getChildByIndex(dstIndex*3))
-        SharedFunc.copyParamToParam(param.getChildByIndex(srcIndex*3+1), param.getChildByIndex(dstIndex*3+1))
-        SharedFunc.copyParamToParam(param.getChildByIndex(srcIndex*3+2), param.getChildByIndex(dstIndex*3+2))
+        SharedFunc.copyVec3Param(param, param, srcIndex*3, dstIndex*3)
 
 
 @Decorators.undogroup('DreamGaffer Add light')
@@ -151,24 +164,19 @@ def setOverride(self, path, attrName, time, attrData, index=None, *args, **kwarg
 
 
 
-#nb.setCustomMethod('setInteractiveTransform', setInteractiveTransform)
-nb.setCustomMethod('setInteractiveTransformFlag', setInteractiveTransformFlag)
-
-nb.setCustomMethod('increaseArrays', increaseArrays)
-nb.setCustomMethod('duplicateLocation', duplicateLocation)
-nb.setCustomMethod('removeLocationAtIndex', removeLocationAtIndex)
-nb.setCustomMethod('setParamAtIndex', setParamAtIndex)
-nb.setCustomMethod('setMaterialAtIndex', setMaterialAtIndex)
-nb.setCustomMethod('canOverride', canOverride)
-nb.setCustomMethod('setOverride', setOverride)
-nb.setCustomMethod('addLocationAtIndex', addLocationAtIndex)
-
-nb.setCustomMethod('setXformValuesAtIndex', SharedFunc.setXformValuesAtIndex)
-nb.setCustomMethod('getIndexForLocation', SharedFunc.getIndexForLocation)
-nb.setCustomMethod('loadXformDataFromIndex', SharedFunc.loadXformDataFromIndex)
-nb.setCustomMethod("getListFromParam", SharedFunc.getListFromParam)
-nb.setCustomMethod('initXformParam', SharedFunc.initXformParam)
-nb.setCustomMethod('renameLocation', SharedFunc.renameLocation)
+SharedFunc.registerCommonMethods(nb, xform=True)
+SharedFunc.registerCustomMethods(nb, {
+    #'setInteractiveTransform': setInteractiveTransform,
+    'setInteractiveTransformFlag': setInteractiveTransformFlag,
+    'increaseArrays': increaseArrays,
+    'duplicateLocation': duplicateLocation,
+    'removeLocationAtIndex': removeLocationAtIndex,
+    'setParamAtIndex': setParamAtIndex,
+    'setMaterialAtIndex': setMaterialAtIndex,
+    'canOverride': canOverride,
+    'setOverride': setOverride,
+    'addLocationAtIndex': addLocationAtIndex,
+})
 
 nb.setBuildOpChainFnc(buildOpChain)
 nb.addTransformParameters(gb)
@@ -22,36 +22,57 @@ def buildOpChain(self, interface):
     interface.setMinRequiredInputs(0)
     frameTime = interface.getFrameTime()
     topLocation = self.getParameter("topLocation").getValue(0)
-    locationList = self.getListFromParam("locations", frameTime)
-    trans = self.getListFromParam("translate", frameTime)
-    rotate = self.getListFromParam("rotate", frameTime)
-    scale = self.getListFromParam("scale", frameTime)
+    locationList = self.getListFromParam("locations", frameTime, interface)
+    if not any(locationList):
+        # no locations yet (or only removed/reserved entries)
+        return
+    trans = self.getListFromParam("translate", frameTime, interface)
+    rotate = self.getListFromParam("rotate", frameTime, interface)
+    scale = self.getListFromParam("scale", frameTime, interface)
+
+    # attributes shared by every location are built once
+    typeAttr = FnAttribute.StringAttribute("rig")
+    exclusiveToAttr = FnAttribute.StringAttribute(self.getName())
 
     sscb = FnGeolibServices.OpArgsBuilders.StaticSceneCreate()
-    for i, loc in enumerate(locationList):
-        locationPath = topLocation + "/" + loc
-        sscb.setAttrAtLocation(locationPath, "xform.interactive.translate", FnAttribute.DoubleAttribute([trans[i*3], trans[i*3+1], trans[i*3+2]]))
-        sscb.setAttrAtLocation(locationPath, "xform.interactive.rotateZ", FnAttribute.DoubleAttribute([rotate[i*3+2], 0, 0, 1]))
-        sscb.setAttrAtLocation(locationPath, "xform.interactive.rotateY", FnAttribute.DoubleAttribute([rotate[i*3+1], 0, 1, 0]))
-        sscb.setAttrAtLocation(locationPath, "xform.interactive.rotateX", FnAttribute.DoubleAttribute([rotate[i*3], 1, 0, 0]))
-        sscb.setAttrAtLocation(locationPath, "xform.interactive.scale", FnAttribute.DoubleAttribute([scale[i*3], scale[i*3+1], scale[i*3+2]]))
-        sscb.setAttrAtLocation(locationPath, "type", FnAttribute.StringAttribute("rig"))
-        sscb.setAttrAtLocation(locationPath, "attributeEditor.exclusiveTo", FnAttribute.StringAttribute(self.getName()))
+    # names used for every location are bound once outside the loop
+    setAttrAtLocation = sscb.setAttrAtLocation
+    GroupBuilder = FnAttribute.GroupBuilder
+    DoubleAttribute = FnAttribute.DoubleAttribute
+    xAxis, yAxis, zAxis = SharedFunc.X_AXIS, SharedFunc.Y_AXIS, SharedFunc.Z_AXIS
+    locationPaths = SharedFunc.getLocationPaths(topLocation, locationList)
+    for i, locationPath in enumerate(locationPaths):
+        if locationPath is None:
+            # removed or reserved entry
+            continue
+        # the xform group is built in one go and set with a single call,
+        # the order of the children is the order the xform is applied in
+        j = i*3
+        xformGb = GroupBuilder()
+        xformGb.set("translate", DoubleAttribute(trans[j:j+3]))
+        xformGb.set("rotateZ", DoubleAttribute([rotate[j+2]] + zAxis))
+        xformGb.set("rotateY", DoubleAttribute([rotate[j+1]] + yAxis))
+        xformGb.set("rotateX", DoubleAttribute([rotate[j]] + xAxis))
+        xformGb.set("scale", DoubleAttribute(scale[j:j+3]))
+        setAttrAtLocation(locationPath, "xform.interactive", xformGb.build())
+        setAttrAtLocation(locationPath, "type", typeAttr)
+        setAttrAtLocation(locationPath, "attributeEditor.exclusiveTo", exclusiveToAttr)
         
     interface.appendOp("StaticSceneCreate", sscb.build())
     
 
-def increaseArrays(self):
+def increaseArrays(self, count=1):
     for paramName in ["locations",  "order"]:
         param = self.getParameter(paramName)
         num = param.getNumChildren()
-        param.resizeArray(num + 1)
+        param.resizeArray(num + count)
     
-    self.initXformParam()
+    self.initXformParam(count)
 
 def removeLocationAtIndex(self, index):
     # reset values..
     self.getParameter("locations").getChildByIndex(index).setValue("", 0)    
+    SharedFunc.clearLocationIndexCache(self)
     for paramName in ["translate", "rotate", "scale"]:
         param = self.getParameter(paramName)
         newValue = 0
@@ -66,9 +87,7 @@ def duplicateLocation(self, srcIndex, dstIndex, dstLocation):
     
     for paramName in ["translate", "rotate", "scale"]:
         param = self.getParameter(paramName)
-        SharedFunc.copyParamToParam(param.getChildByIndex(srcIndex*3), param.getChildByIndex(dstIndex*3))
-        SharedFunc.copyParamToParam(param.getChildByIndex(srcIndex*3+1), param.getChildByIndex(dstIndex*3+1))
-        SharedFunc.copyParamToParam(param.getChildByIndex(srcIndex*3+2), param.getChildByIndex(dstIndex*3+2))
+        SharedFunc.copyVec3Param(param, param, srcIndex*3, dstIndex*3)
 
 def setParamAtIndex(self, param, index):
     #name = param.getFullName()
@@ -96,23 +115,17 @@ def setOverride(self, path, attrName, time, attrData, index=None, *args, **kwarg
     if attrName.startswith("xform.interactive"):
         SharedFunc.setOverrrideXform(self, locationIndex, index, attrName, attrData, time)
 
-nb.setCustomMethod('setInteractiveTransformFlag', setInteractiveTransformFlag)
-nb.setCustomMethod('increaseArrays', increaseArrays)
-nb.setCustomMethod('duplicateLocation', duplicateLocation)
-nb.setCustomMethod('removeLocationAtIndex', removeLocationAtIndex)
-
-nb.setCustomMethod('setParamAtIndex', setParamAtIndex)
-nb.setCustomMethod('canOverride', canOverride)
-nb.setCustomMethod('setOverride', setOverride)
-
-nb.setCustomMethod('setXformValuesAtIndex', SharedFunc.setXformValuesAtIndex)
-nb.setCustomMethod('getIndexForLocation', SharedFunc.getIndexForLocation)
-nb.setCustomMethod('loadXformDataFromIndex', SharedFunc.loadXformDataFromIndex)
-nb.setCustomMethod("getListFromParam", SharedFunc.getListFromParam)
-nb.setCustomMethod('initXformParam', SharedFunc.initXformParam)
-nb.setCustomMethod('addLocationAtIndex', SharedFunc.addLocationAtIndex)
-nb.setCustomMethod('renameLocation', SharedFunc.renameLocation)
-
+SharedFunc.registerCommonMethods(nb, xform=True)
+SharedFunc.registerCustomMethods(nb, {
+    'setInteractiveTransformFlag': setInteractiveTransformFlag,
+    'increaseArrays': increaseArrays,
+    'duplicateLocation': duplicateLocation,
+    'removeLocationAtIndex': removeLocationAtIndex,
+    'setParamAtIndex': setParamAtIndex,
+    'canOverride': canOverride,
+    'setOverride': setOverride,
+    'addLocationAtIndex': SharedFunc.addLocationAtIndex,
+})
 
 nb.setBuildOpChainFnc(buildOpChain)
 nb.addTransformParameters(gb)
@@ -2,7 +2,15 @@
 # SPDX-License-Identifier: Apache-2.0
 
 import os
-from Katana import NodegraphAPI
+from Katana import NodegraphAPI, Nodes3DAPI, FnGeolibServices, FnAttribute
+
+# rotation axes, appended to the angle of each rotate attribute
+X_AXIS = [1, 0, 0]
+Y_AXIS = [0, 1, 0]
+Z_AXIS = [0, 0, 1]
+
+# offset of each interactive rotate attribute in the flat rotate array
+ROTATE_OFFSETS = {"rotateX": 0, "rotateY": 1, "rotateZ": 2}
 
 
 def copyParamToParam(srcParam, dstParam):
@@ -16,51 +24,92 @@ def copyParamToParam(srcParam, dstParam):
     else:
         dstParam.setValue(srcParam.getValue(0), 0)
 
+def copyVec3Param(srcParam, dstParam, srcStart, dstStart):
+    # copy the 3 components starting at srcStart to the ones at dstStart
+    for k in range(3):
+        copyParamToParam(srcParam.getChildByIndex(srcStart + k), dstParam.getChildByIndex(dstStart + k))
+
 
-def initXformParam(node):
+def initXformParam(node, count=1):
     for paramName in ["translate", "rotate", "scale"]:
         param = node.getParameter(paramName)
         num = param.getNumChildren()
-        param.resizeArray(num + 3)
+        param.resizeArray(num + 3*count)
         if paramName == "scale":
-            param.getChildByIndex(num).setValue(1, 0)
-            param.getChildByIndex(num+1).setValue(1, 0)
-            param.getChildByIndex(num+2).setValue(1, 0)
+            # the new children come back in one call, no lookup per index
+            for child in param.getChildren()[num:]:
+                child.setValue(1, 0)
+
+def getArrayGrowth(num):
+    # grow the arrays by a fraction of their size so adding many locations
+    # doesn't resize every parameter array on every add
+    return max(4, num >> 3)
 
 def addLocationAtIndex(node, locName, index):
     # find available location first before resizing array..
     param = node.getParameter("locations")
 
-    if index == param.getNumChildren():
-        node.increaseArrays()
+    num = param.getNumChildren()
+    if index >= num:
+        node.increaseArrays(max(index + 1 - num, getArrayGrowth(num)))
     
     node.getParameter("locations").getChildByIndex(index).setValue(locName, 0)
+    clearLocationIndexCache(node)
 
 def renameLocation(node, index,  newLocation):
     node.getParameter("locations").getChildByIndex(index).setValue(newLocation, 0)
+    clearLocationIndexCache(node)
+
+def renameLocations(node, renames):
+    # renames is a list of (index, newLocation), the index cache is only
+    # dropped once for the whole list
+    param = node.getParameter("locations")
+    for index, newLocation in renames:
+        param.getChildByIndex(index).setValue(newLocation, 0)
+    clearLocationIndexCache(node)
 
-def getListFromParam(node, paramName, frameTime):
+def getListFromParam(node, paramName, frameTime, interface=None):
     param = node.getParameter(paramName)
-    result = []
-    for c in param.getChildren():
-        result.append(c.getValue(frameTime))
-    
-    return result
+    if interface is not None:
+        # read the whole array in one call instead of one call per child.
+        # the samples are relative to frameTime, numbers stay doubles
+        attr = interface.buildAttrFromParam(param, numberType=FnAttribute.DoubleAttribute)
+        if attr is not None:
+            return list(attr.getNearestSample(0.0))
+
+    return [c.getValue(frameTime) for c in param.getChildren()]
 
 def loadXformDataFromIndex(node, index):
     for paramName in ["translate", "rotate", "scale"]:
         param = node.getParameter(paramName)
         dstParam = node.getParameter('transform.'+paramName)
-        copyParamToParam(param.getChildByIndex(index*3), dstParam.getChildByIndex(0))
-        copyParamToParam(param.getChildByIndex(index*3+1), dstParam.getChildByIndex(1))
-        copyParamToParam(param.getChildByIndex(index*3+2), dstParam.getChildByIndex(2))
+        copyVec3Param(param, dstParam, index*3, 0)
+
+def clearLocationIndexCache(node):
+    node._locationIndexCache = None
+
+def getLocationPaths(topLocation, locationList):
+    # full scene graph path of every location, None for removed or reserved
+    # entries
+    locationPrefix = topLocation + "/"
+    return [locationPrefix + loc if loc else None for loc in locationList]
 
 def getIndexForLocation(node, location):
-    for i, child in  enumerate(node.getParameter("locations").getChildren()):
-        #print i
-        #print child.getValue(0)
-        if child.getValue(0) == location:
-            return i
+    param = node.getParameter("locations")
+    cache = getattr(node, "_locationIndexCache", None)
+    if cache is not None:
+        index = cache.get(location)
+        # the parameter can change without going through this node (undo),
+        # so make sure the cached index still holds the location
+        if index is not None and index < param.getNumChildren() \
+                and param.getChildByIndex(index).getValue(0) == location:
+            return index
+
+    cache = {}
+    for i, child in enumerate(param.getChildren()):
+        cache.setdefault(child.getValue(0), i)
+    node._locationIndexCache = cache
+    return cache.get(location)
 
 def setXformValuesAtIndex(node, paramName, values, index):
     param = node.getParameter(paramName)
@@ -74,15 +123,152 @@ def getRelativePathToRoot(path, rootPath):
         return path
     if path == rootPath:
         return ""
+    # scene graph paths under the root only need the prefix stripped
+    rootPrefix = rootPath + "/"
+    if path.startswith(rootPrefix):
+        return path[len(rootPrefix):]
     return os.path.relpath(path, rootPath)
 
 def setOverrrideXform(node, locationIndex, index, attrName, attrData, time):
     paramName = attrName.split(".")[-1]
-    if paramName == "rotateX":
-        node.getParameter("rotate").getChildByIndex(3*locationIndex+0).setValue(attrData[0], time)
-    elif paramName == "rotateY":
-        node.getParameter("rotate").getChildByIndex(3*locationIndex+1).setValue(attrData[0], time)
-    elif paramName == "rotateZ":
-        node.getParameter("rotate").getChildByIndex(3*locationIndex+2).setValue(attrData[0], time)
+    baseIndex = 3*locationIndex
+    rotateOffset = ROTATE_OFFSETS.get(paramName)
+    if rotateOffset is not None:
+        node.getParameter("rotate").getChildByIndex(baseIndex+rotateOffset).setValue(attrData[0], time)
     else:
-        node.getParameter(paramName).getChildByIndex(3*locationIndex+index).setValue(attrData[0], time)
\ No newline at end of file
+        node.getParameter(paramName).getChildByIndex(baseIndex+index).setValue(attrData[0], time)
+
+def duplicateLocations(node, duplicates):
+    # duplicates is a list of (srcIndex, dstIndex, dstLocation), the arrays
+    # are grown once for the whole list instead of once per location
+    param = node.getParameter("locations")
+    num = param.getNumChildren()
+    maxIndex = max(dstIndex for srcIndex, dstIndex, dstLocation in duplicates)
+    if maxIndex >= num:
+        node.increaseArrays(max(maxIndex + 1 - num, getArrayGrowth(num)))
+    for srcIndex, dstIndex, dstLocation in duplicates:
+        node.duplicateLocation(srcIndex, dstIndex, dstLocation)
+
+
+def registerCustomMethods(nb, methods):
+    for name, fn in methods.items():
+        nb.setCustomMethod(name, fn)
+
+# custom methods every Multi*Create node shares
+COMMON_METHODS = {
+    "getIndexForLocation": getIndexForLocation,
+    "getListFromParam": getListFromParam,
+    "renameLocation": renameLocation,
+    "renameLocations": renameLocations,
+    "duplicateLocations": duplicateLocations,
+}
+
+# custom methods shared by the nodes that keep a transform per location
+XFORM_METHODS = {
+    "setXformValuesAtIndex": setXformValuesAtIndex,
+    "loadXformDataFromIndex": loadXformDataFromIndex,
+    "initXformParam": initXformParam,
+}
+
+def registerCommonMethods(nb, xform=False):
+    registerCustomMethods(nb, COMMON_METHODS)
+    if xform:
+        registerCustomMethods(nb, XFORM_METHODS)
+
+
+# custom methods of the nodes that only assign a material per location
+# (MultiMaterialCreate, MultiLightFilterCreate)
+
+def setMaterialAtIndex(node, materialPath, index):
+    node.getParameter("material").getChildByIndex(index).setValue(materialPath, 0)
+
+def increaseMaterialArrays(node, count=1):
+    for paramName in ["locations", "material", "order"]:
+        param = node.getParameter(paramName)
+        num = param.getNumChildren()
+        param.resizeArray(num + count)
+
+def removeMaterialLocationAtIndex(node, index):
+    # reset values..
+    node.getParameter("locations").getChildByIndex(index).setValue("", 0)
+    clearLocationIndexCache(node)
+    node.getParameter("material").getChildByIndex(index).setValue("",0)
+
+def duplicateMaterialLocation(node, srcIndex, dstIndex, dstLocation):
+    node.addLocationAtIndex(dstLocation, dstIndex)
+    materialParam = node.getParameter("material")
+    copyParamToParam(materialParam.getChildByIndex(srcIndex), materialParam.getChildByIndex(dstIndex))
+
+def addMaterialLocationAtIndex(node, locName, index, isChild=False):
+    addLocationAtIndex(node, locName, index)
+    if isChild:
+        node.getParameter("material").getChildByIndex(index).setValue("../", 0)
+
+def buildMultiCreateNodeType(typeName, locationType, shaderAttrName):
+    '''
+    Returns the NodeTypeBuilder of a node creating locations of locationType
+    below topLocation, each with an optional material assigned to
+    shaderAttrName. The caller registers any extra methods and builds it.
+    '''
+    nb = Nodes3DAPI.NodeTypeBuilder(typeName)
+    nb.setOutputPortNames(('out', ))
+
+    gb = FnAttribute.GroupBuilder()
+    gb.set("topLocation", FnAttribute.StringAttribute('/root/world/lgt'))
+    gb.set("locations", FnAttribute.StringAttribute([]))
+    gb.set("order", FnAttribute.IntAttribute([]))
+    gb.set("material", FnAttribute.StringAttribute([]))
+
+    def buildOpChain(self, interface):
+        interface.setMinRequiredInputs(0)
+        frameTime = interface.getFrameTime()
+        topLocation = self.getParameter("topLocation").getValue(0)
+        locationList = self.getListFromParam("locations", frameTime, interface)
+        if not any(locationList):
+            # no locations yet (or only removed/reserved entries)
+            return
+        material = self.getListFromParam("material", frameTime, interface)
+        materialEditNodeName = self.getParent().getMaterialEditNode().getName()
+
+        # attributes shared by every location are built once
+        typeAttr = FnAttribute.StringAttribute(locationType)
+        attributeEditorAttr = FnAttribute.GroupBuilder() \
+            .set("exclusiveTo", FnAttribute.StringAttribute(self.getName())) \
+            .set("material.exclusiveTo", FnAttribute.StringAttribute(materialEditNodeName)) \
+            .build()
+
+        sscb = FnGeolibServices.OpArgsBuilders.StaticSceneCreate()
+        locationPaths = getLocationPaths(topLocation, locationList)
+        for i, locationPath in enumerate(locationPaths):
+            if locationPath is None:
+                # removed or reserved entry
+                continue
+            sscb.setAttrAtLocation(locationPath, "type", typeAttr)
+            sscb.setAttrAtLocation(locationPath, "attributeEditor", attributeEditorAttr)
+
+            mat = material[i]
+            if mat == "":
+                continue
+            if mat.startswith("../"):
+                sscb.setAttrAtLocation(locationPath, "inherits", FnAttribute.StringAttribute(mat))
+            else:
+                sscb.setAttrAtLocation(locationPath, shaderAttrName, FnAttribute.StringAttribute(mat))
+
+        interface.appendOp("StaticSceneCreate", sscb.build())
+
+    registerCommonMethods(nb)
+    registerCustomMethods(nb, {
+        'increaseArrays': increaseMaterialArrays,
+        'duplicateLocation': duplicateMaterialLocation,
+        'removeLocationAtIndex': removeMaterialLocationAtIndex,
+        'setMaterialAtIndex': setMaterialAtIndex,
+        'addLocationAtIndex': addMaterialLocationAtIndex,
+    })
+
+    nb.setBuildOpChainFnc(buildOpChain)
+    nb.addTransformParameters(gb)
+    nb.setParametersTemplateAttr(gb.build())
+    nb.setHintsForParameter('topLocation', {
+            'widget': 'scenegraphLocation',
+        })
+    return nb
@@ -6,23 +6,25 @@ def registerExrHeaderAttrsNode():
     
     def buildOpChain(self, interface):
         time = interface.getFrameTime()
-        asb = FnGeolibServices.OpArgsBuilders.AttributeSet()
-        asb.setLocationPaths(FnAttribute.StringAttribute('/root'))
-        
+
         # Set value on exr_header_attributes for every render output listed
         name = self.getParameter('name').getValue(time)
-        if name:
-            outputs = self.getParameter('args.outputs.value').getValue(time).split(',')
-            for output in outputs:
-                if output:
-                    type = self.getParameter('type').getValue(time)
-                    asb.setAttr('renderSettings.outputs.{0}.rendererSettings.exr_header_attributes.{1}'.format(output, name),
-                                interface.buildAttrFromParam(self.getParameter(type)))
-                      
-              
-            gb = FnAttribute.GroupBuilder()
-            gb.update(asb.build())
-            interface.appendOp('AttributeSet', gb.build())
+        if not name:
+            return
+        outputs = [output for output in self.getParameter('args.outputs.value').getValue(time).split(',')
+                   if output]
+        if not outputs:
+            return
+
+        asb = FnGeolibServices.OpArgsBuilders.AttributeSet()
+        asb.setLocationPaths(FnAttribute.StringAttribute('/root'))
+        # the value is the same for every output
+        type = self.getParameter('type').getValue(time)
+        valueAttr = interface.buildAttrFromParam(self.getParameter(type))
+        for output in outputs:
+            asb.setAttr('renderSettings.outputs.{0}.rendererSettings.exr_header_attributes.{1}'.format(output, name),
+                        valueAttr)
+        interface.appendOp('AttributeSet', asb.build())
     
     def getScenegraphLocation(self, frameTime):
         return "/root"
@@ -1,62 +1,128 @@
 # Copyright 2025 DreamWorks Animation LLC
 # SPDX-License-Identifier: Apache-2.0
 
-import os
+import sys
+import traceback
+import itertools
+from collections import OrderedDict
 import Helper
 
+if sys.version_info[0] >= 3:
+    intern = sys.intern
+
+def internLocation(location):
+    # every cache shares one string object per location, which also makes
+    # the dict lookups compare by identity. python 2 only interns str
+    if type(location) is str:
+        return intern(location)
+    return location
+
+def printException():
+    # the caches report errors and carry on, the scene stays editable
+    traceback.print_exc()
+
+# location types that can be children of a light or a rig
+CHILD_LOCATION_TYPES = ("light", "rig", "light filter")
+
 def getLocationPath(parentPath, name):
-    if parentPath and parentPath!="":
+    if parentPath:
         return parentPath+"/"+name
     return name
+
+def splitLocationPath(location):
+    # parent path and name of a location in one scan
+    parentPath, _, name = location.rpartition("/")
+    return parentPath, name
+
+class CacheEntry(object):
+    # one per location, slots keep the entries small on large rigs. the entry
+    # keeps its parent path and its own name (segment) so they don't have
+    # to be split out of the location again
+    __slots__ = ("index", "children", "parent", "segment")
+
+    def __init__(self, index, location, children=None):
+        self.index = index
+        # ordered like the child list it replaced, duplicates are created in
+        # the order of their source's children
+        self.children = children if children is not None else OrderedDict()
+        self.parent, self.segment = splitLocationPath(location)
+
+    def __repr__(self):
+        return repr({"index": self.index, "children": self.children,
+                     "parent": self.parent, "segment": self.segment})
+
 '''
-lights = {"a": {"index": 0, "children": ["b", "c"]}, 
-            "a/b": {"index": 1, "children": ["d"]}, 
-            "a/c":{"index":2, "children": []}
-            "a/b/d": {"index":3, "children": []}}
+lights = {"a": {"index": 0, "children": {"b": "light", "c": "light"}, "parent": "", "segment": "a"}, 
+            "a/b": {"index": 1, "children": {"d": "light"}, "parent": "a", "segment": "b"}, 
+            "a/c":{"index":2, "children": {}, "parent": "a", "segment": "c"}
+            "a/b/d": {"index":3, "children": {}, "parent": "a/b", "segment": "d"}}
 '''
 class BaseCache():
     def __init__(self, control, locationType):
         self.cache = {}
-        self.unused = []
+        self.byIndex = {} # index -> location, the reverse of cache
+        self.unused = set()
         self.control = control
         self.locationType = locationType
         self.node = None # the node that created the location
 
+    def __len__(self):
+        return len(self.cache)
+
+    def __repr__(self):
+        # a summary, printing every entry of a large cache is slow
+        return "<%s %s: %d locations %s>" % (self.__class__.__name__, self.locationType,
+                                             len(self.cache), list(itertools.islice(self.cache, 5)))
+
+    def items(self):
+        return self.cache.items()
+
     def clearCache(self):
-        self.unused = []
+        self.unused = set()
         self.cache.clear()
+        self.byIndex.clear()
 
     def buildCache(self, targetNode):
         if not targetNode:
             return
 
         self.node = targetNode
-        p = targetNode.getParameter("locations")
-        locationList = {}
-        for i, child in enumerate(p.getChildren()): 
-            if child.getValue(0) == "":
-                self.unused.append(i)
-            else:
-                locationList[child.getValue(0)] = i
-        
-        # process the list of locations
-        for location, i in locationList.iteritems():
-            self.cache[location] = {"index": i, "children": []}
-        
-        for location in locationList.keys():
-            parent = os.path.dirname(location)
-            if parent=="":
-                continue
-            
-            if not self.addChildToParent(parent, os.path.basename(location), self.locationType):
+        for info in self.readLocations(targetNode):
+            parent = info.parent
+            childName = info.segment
+            if not self.addChildToParent(parent, childName, self.locationType):
                 if self.locationType == "light filter":
-                    self.control.getLightCache().addChildToParent(parent, os.path.basename(location), self.locationType)
+                    self.control.getLightCache().addChildToParent(parent, childName, self.locationType)
+
+    def readLocations(self, targetNode):
+        # add every location of the node to the cache in one pass, empty ones
+        # are free indices. returns the entries that have a parent, top level
+        # locations don't need linking
+        cache = self.cache
+        byIndex = self.byIndex
+        addUnused = self.unused.add
+        children = []
+        for i, child in enumerate(targetNode.getParameter("locations").getChildren()):
+            location = internLocation(child.getValue(0))
+            if location == "":
+                addUnused(i)
+                continue
+            info = cache.get(location)
+            if info is not None:
+                # a repeated location keeps its last index
+                byIndex.pop(info.index, None)
+            info = CacheEntry(i, location)
+            cache[location] = info
+            byIndex[i] = location
+            if info.parent:
+                children.append(info)
+        return children
 
     def addChildToParent(self, parentPath, childName, locationType):
         if parentPath not in self.cache:
             return False
-        children = self.cache[parentPath].get("children", [])
-        children.append(childName)
+        children = self.cache[parentPath].children
+        children[childName] = locationType
         return True
 
     def setNode(self, node):
@@ -70,98 +136,267 @@ class BaseCache():
     def getIndexForLocation(self, location):
         info = self.cache.get(location)
         if info:
-            return info.get("index")
+            return info.index
     
+    def getLocationForIndex(self, index):
+        return self.byIndex.get(index)
+
     def getIndexForNewLocation(self):
         if self.unused:
-            return self.unused.pop()
+            # the lowest free index, so new locations land in the same
+            # slots from run to run
+            index = min(self.unused)
+            self.unused.remove(index)
+            return index
         return len(self.cache)
 
     def updateChildName(self, parentPath, newName, oldName, locationType):
         if parentPath in self.cache:
-            children = self.cache[parentPath].get("children")
+            children = self.cache[parentPath].children
             if oldName!=None and oldName in children:
-                children.remove(oldName)
+                del children[oldName]
             if newName:
-                children.append(newName)
+                children[newName]=locationType
             return True
         return False
     
     def rename(self, oldLocation, newName): # rename a leaf
         try:
             # update parent cache..
-            parentPath = os.path.dirname(oldLocation)
+            parentPath, oldName = splitLocationPath(oldLocation)
             newLocation = getLocationPath(parentPath, newName)
-            oldName = os.path.basename(oldLocation)
             self.control.findAndUpdateChildName(parentPath, newName, oldName, self.locationType)
             self.renameLocation(oldLocation, newLocation)
         except:
-            import traceback
-            traceback.print_exc()
+            printException()
 
     def renameLocation(self, oldLocation, newLocation):
         # update the key...info stays the same.
-        info = self.cache.pop(oldLocation)
-        index = info.get("index")
+        newLocation = internLocation(newLocation)
+        info = self.cache.pop(oldLocation, None)
+        if info is None:
+            return
+        index = info.index
+        info.parent, info.segment = splitLocationPath(newLocation)
         self.cache[newLocation] = info
+        self.byIndex[index] = newLocation
         self.node.renameLocation(index, newLocation)
         self.control.renameSingleLocation(oldLocation, newLocation)
         # update children..
-        self.recursiveRenameChildLocation(oldLocation, info.get("children"), newLocation)
+        self.recursiveRenameChildLocation(oldLocation, info.children, newLocation)
 
     def recursiveRenameChildLocation(self, parentPath, children, newParentPath):
         # children of light are always lights..
-        for childName in children:
-            location = getLocationPath(parentPath, childName)
-            newLocation = getLocationPath(newParentPath, childName)
-            if location in self.cache:
-                info = self.cache.pop(location)
-                index = info.get("index")
-                children = info.get("children") # direct children name stays the same
-                self.cache[newLocation] = info
-                self.node.renameLocation(index, newLocation)
-                self.control.renameSingleLocation(location, newLocation)
-                self.recursiveRenameChildLocation(location, children, newLocation)
+        if len(children) * 2 > len(self.cache):
+            # the subtree holds most of the cache, one pass over the cache
+            # is cheaper than walking it
+            self.renameSubtree(parentPath, children, newParentPath)
+            return
+
+        # the tree is walked with a stack so deep hierarchies don't recurse,
+        # the methods used for every location are looked up once. children
+        # are pushed in reverse so they are visited in order
+        cache = self.cache
+        byIndex = self.byIndex
+        # the nodes are renamed once for the whole subtree
+        nodeRenames = []
+        renames = []
+        stack = [(parentPath, newParentPath, childName) for childName in reversed(children)]
+        while stack:
+            parentPath, newParentPath, childName = stack.pop()
+            # the parents below the renamed location are never empty
+            location = parentPath + "/" + childName
+            newLocation = internLocation(newParentPath + "/" + childName)
+            info = cache.pop(location, None)
+            if info is None:
+                continue
+            index = info.index
+            # only the parent changes, the segment stays the same
+            info.parent = newParentPath
+            cache[newLocation] = info
+            byIndex[index] = newLocation
+            nodeRenames.append((index, newLocation))
+            renames.append((location, newLocation))
+            # direct children name stays the same
+            for grandchildName in reversed(info.children):
+                stack.append((location, newLocation, grandchildName))
+
+        self.renameNodeLocations(nodeRenames, renames)
     
+    def getLinkedSubtree(self, parentPath, children):
+        # the locations below parentPath that a walk from its children would
+        # reach, found with one pass over the cache. entries that only share
+        # the path prefix without being linked to a parent are left out
+        prefix = parentPath + "/"
+        cache = self.cache
+        linked = {}
+        subtree = []
+        for location in [loc for loc in cache if loc.startswith(prefix)]:
+            # go up to the first parent that is known, then link down again
+            chain = []
+            each = location
+            while True:
+                chain.append(each)
+                parent = cache[each].parent
+                if parent == parentPath:
+                    isLinked = True
+                    break
+                if parent in linked:
+                    isLinked = linked[parent]
+                    break
+                if parent not in cache:
+                    isLinked = False
+                    break
+                each = parent
+            for each in reversed(chain):
+                if isLinked:
+                    info = cache[each]
+                    parentChildren = children if info.parent == parentPath else cache[info.parent].children
+                    isLinked = info.segment in parentChildren
+                linked[each] = isLinked
+            if isLinked:
+                subtree.append(location)
+        return subtree
+
+    def renameSubtree(self, parentPath, children, newParentPath):
+        # rename every linked location below parentPath, the children names
+        # stay the same
+        prefix = parentPath + "/"
+        start = len(prefix)
+        newPrefix = newParentPath + "/"
+        cache = self.cache
+        byIndex = self.byIndex
+        nodeRenames = []
+        renames = []
+        for location in self.getLinkedSubtree(parentPath, children):
+            newLocation = internLocation(newPrefix + location[start:])
+            info = cache.pop(location)
+            index = info.index
+            oldParent = info.parent
+            info.parent = newParentPath if oldParent == parentPath else newPrefix + oldParent[start:]
+            cache[newLocation] = info
+            byIndex[index] = newLocation
+            nodeRenames.append((index, newLocation))
+            renames.append((location, newLocation))
+
+        self.renameNodeLocations(nodeRenames, renames)
+
+    def renameNodeLocations(self, nodeRenames, renames):
+        # nodeRenames is a list of (index, newLocation) for the node that
+        # created the locations, renames a list of (location, newLocation)
+        if not nodeRenames:
+            return
+        renameLocations = getattr(self.node, "renameLocations", None)
+        if renameLocations:
+            renameLocations(nodeRenames)
+        else:
+            for index, newLocation in nodeRenames:
+                self.node.renameLocation(index, newLocation)
+        self.control.renameLocations(renames)
+
     def recursiveDuplicateLocation(self, srcLocation, dstLocation):
-        if srcLocation in self.cache:
-            srcIndex = self.cache[srcLocation].get("index")
-            dstIndex = self.getIndexForNewLocation()
+        cache = self.cache
+        byIndex = self.byIndex
+        getIndexForNewLocation = self.getIndexForNewLocation
+        duplicateSingleLocation = self.control.duplicateSingleLocation
+        # the node copies its data for the whole subtree in one call
+        duplicates = []
+        stack = [(srcLocation, dstLocation)]
+        while stack:
+            srcLocation, dstLocation = stack.pop()
+            if srcLocation not in cache:
+                continue
+            srcInfo = cache[srcLocation]
+            srcIndex = srcInfo.index
+            dstIndex = getIndexForNewLocation()
             # add new location to cache..
-            self.cache[dstLocation] = {"index": dstIndex, "children": self.cache[srcLocation].get("children")[:]}
+            dstLocation = internLocation(dstLocation)
+            cache[dstLocation] = CacheEntry(dstIndex, dstLocation, srcInfo.children.copy())
+            byIndex[dstIndex] = dstLocation
             # copy data
-            self.node.duplicateLocation(srcIndex, dstIndex, dstLocation)
-            self.control.duplicateSingleLocation(srcLocation, dstLocation) # duplicate other attributes
+            duplicates.append((srcIndex, dstIndex, dstLocation))
+            duplicateSingleLocation(srcLocation, dstLocation) # duplicate other attributes
 
-            children = self.cache[srcLocation].get("children", [])
-            for name in children:
-                childLocationSrc = getLocationPath(srcLocation, name)
-                childLocationDst = getLocationPath(dstLocation, name)
-                self.recursiveDuplicateLocation(childLocationSrc, childLocationDst)
+            # pushed in reverse so the children are duplicated in order
+            for name in reversed(srcInfo.children):
+                stack.append((srcLocation + "/" + name, dstLocation + "/" + name))
 
+        self.duplicateNodeLocations(duplicates)
+
+    def duplicateNodeLocations(self, duplicates):
+        # duplicates is a list of (srcIndex, dstIndex, dstLocation)
+        if not duplicates:
+            return
+        duplicateLocations = getattr(self.node, "duplicateLocations", None)
+        if duplicateLocations:
+            duplicateLocations(duplicates)
+        else:
+            for srcIndex, dstIndex, dstLocation in duplicates:
+                self.node.duplicateLocation(srcIndex, dstIndex, dstLocation)
     
     def recursiveRemoveLocation(self, parentPath, name):
+        # a single handler for the whole removal, the walk itself doesn't
+        # need one as missing locations are skipped
         try:
-            location = getLocationPath(parentPath, name)
-            lightInfo = self.cache.pop(location)
-            index = lightInfo.get("index")
-            self.unused.append(index)
-            self.node.removeLocationAtIndex(index)
-            self.control.removeSingleLocation(location)
-
-            for childName in lightInfo.get("children", []):
-                self.recursiveRemoveLocation(location, childName)
+            self.removeLocationTree(parentPath, name)
         except:
-            import traceback
-            traceback.print_exc()
+            printException()
+
+    def removeLocationTree(self, parentPath, name):
+        location = getLocationPath(parentPath, name)
+        info = self.cache.get(location)
+        if info is not None and len(info.children) * 2 > len(self.cache):
+            # the subtree holds most of the cache, one pass over the cache
+            # is cheaper than walking it
+            self.removeSubtree(location)
+            return
+
+        cachePop = self.cache.pop
+        byIndexPop = self.byIndex.pop
+        addUnused = self.unused.add
+        removeLocationAtIndex = self.node.removeLocationAtIndex
+        removeSingleLocation = self.control.removeSingleLocation
+        stack = [location]
+        while stack:
+            location = stack.pop()
+            lightInfo = cachePop(location, None)
+            if lightInfo is None:
+                continue
+            index = lightInfo.index
+            byIndexPop(index, None)
+            addUnused(index)
+            removeLocationAtIndex(index)
+            removeSingleLocation(location)
+
+            # pushed in reverse so the children are removed in order
+            prefix = location + "/"
+            for childName in reversed(lightInfo.children):
+                stack.append(prefix + childName)
+
+    def removeSubtree(self, location):
+        # remove location and every linked location below it
+        subtree = [location] + self.getLinkedSubtree(location, self.cache[location].children)
+        cachePop = self.cache.pop
+        byIndexPop = self.byIndex.pop
+        addUnused = self.unused.add
+        removeLocationAtIndex = self.node.removeLocationAtIndex
+        removeSingleLocation = self.control.removeSingleLocation
+        for each in subtree:
+            index = cachePop(each).index
+            byIndexPop(index, None)
+            addUnused(index)
+            removeLocationAtIndex(index)
+            removeSingleLocation(each)
 
     def getChildren(self, parentPath):
         if parentPath in self.cache:
-            return self.cache[parentPath].get("children")
+            return self.cache[parentPath].children.keys()
 
     
     def addLocation(self, locationPath, index, isChild):
-        self.cache[locationPath] = {"index": index,   "children": []}
+        locationPath = internLocation(locationPath)
+        self.cache[locationPath] = CacheEntry(index, locationPath)
+        self.byIndex[index] = locationPath
         if not self.node:
             self.node = self.control.initTargetNode(self.locationType)
         
@@ -170,47 +405,47 @@ class BaseCache():
     def copyXformMatAttr(self, attr, index):
         try:
             translate = rotate = scale = []
-            if attr.getChildByName("xform.matrix"):
+            matrixAttr = attr.getChildByName("xform.matrix")
+            if matrixAttr:
                 from Katana import GeoAPI
-                matrix = attr.getChildByName("xform.matrix").getNearestSample(0)
+                matrix = matrixAttr.getNearestSample(0)
                 translate, scale, rotate = GeoAPI.Util.Matrix.explodeMatrix4x4(matrix)
 
-            elif attr.getChildByName("xform.interactive"):
-                translate = attr.getChildByName("xform.interactive.translate").getNearestSample(0)
-                scale = attr.getChildByName("xform.interactive.scale").getNearestSample(0)
-                rotate = []
-                rotate.append(attr.getChildByName("xform.interactive.rotateX").getValue(0))
-                rotate.append(attr.getChildByName("xform.interactive.rotateY").getValue(0))
-                rotate.append(attr.getChildByName("xform.interactive.rotateZ").getValue(0))
+            else:
+                # look up the interactive group once and read its children from it
+                interactive = attr.getChildByName("xform.interactive")
+                if interactive:
+                    translate = interactive.getChildByName("translate").getNearestSample(0)
+                    scale = interactive.getChildByName("scale").getNearestSample(0)
+                    rotate = [interactive.getChildByName("rotateX").getValue(0),
+                              interactive.getChildByName("rotateY").getValue(0),
+                              interactive.getChildByName("rotateZ").getValue(0)]
 
             if translate and rotate and scale:
-                self.node.setXformValuesAtIndex("translate", translate, index)
-                self.node.setXformValuesAtIndex("rotate", rotate, index)
-                self.node.setXformValuesAtIndex("scale", scale, index)
-
-                if attr.getChildByName("inherits"):
-                    inherits =  attr.getChildByName("inherits").getData()[0]
-                    self.node.getParameter("material").getChildByIndex(index).setValue(inherits, 0)
-                else:
-                    if attr.getChildByName("material.moonrayLightShader"):
-                        material = attr.getChildByName("material.moonrayLightShader").getData()[0]
-                        self.node.getParameter("material").getChildByIndex(index).setValue(material, 0)
-
-                    elif attr.getChildByName("material.moonrayLightfilterShader"):
-                        material = attr.getChildByName("material.moonrayLightfilterShader").getData()[0]
-                        self.node.getParameter("material").getChildByIndex(index).setValue(material, 0)
+                setXformValuesAtIndex = self.node.setXformValuesAtIndex
+                setXformValuesAtIndex("translate", translate, index)
+                setXformValuesAtIndex("rotate", rotate, index)
+                setXformValuesAtIndex("scale", scale, index)
+
+                materialAttr = attr.getChildByName("inherits")
+                if not materialAttr:
+                    materialAttr = attr.getChildByName("material.moonrayLightShader")
+                    if not materialAttr:
+                        materialAttr = attr.getChildByName("material.moonrayLightfilterShader")
+                if materialAttr:
+                    material = materialAttr.getData()[0]
+                    self.node.getParameter("material").getChildByIndex(index).setValue(material, 0)
 
         except:
-            import traceback
-            traceback.print_exc()
+            printException()
 
     
     def removeChild(self, parentPath, childName):
         if parentPath not in self.cache:
             return False
-        children = self.cache[parentPath].get("children")
+        children = self.cache[parentPath].children
         if childName in children:
-            children.remove(childName)
+            del children[childName]
             return True
     
 
@@ -219,22 +454,21 @@ class BaseCache():
 
         if parentPath == "":
             if basename not in self.cache:
-                print "no parent path"
+                print("no parent path")
                 return basename
             else:
-                children = self.cache.keys()
+                # top level names are the cache keys themselves, the cache
+                # answers the membership test without copying its keys
+                children = self.cache
         else:
             children = self.getChildren(parentPath)
             if not children:
                 children = self.control.getRigCache().getChildren(parentPath)
            
             if not children: # parent rig might exist in upstream...
-                paths = self.cache.keys()
-                children = []
-                for each in paths:
-                    if not each.startswith(parentPath):
-                        continue
-                    children.append(os.path.relpath(each, parentPath))
+                prefix = parentPath + "/"
+                start = len(prefix)
+                children = set(each[start:] for each in self.cache if each.startswith(prefix))
                         
         return Helper.getUnusedName(basename, children)
 
@@ -254,6 +488,10 @@ class LightRigCache(BaseCache):
     def __init__(self, control, locationType):
         BaseCache.__init__(self, control, locationType)
 
+    def getChildCaches(self):
+        # caches of the location types a child can have, looked up once per walk
+        getCacheOfLocationType = self.control.getCacheOfLocationType
+        return {childType: getCacheOfLocationType(childType) for childType in CHILD_LOCATION_TYPES}
     
     #override
     def buildCache(self, targetNode):
@@ -261,126 +499,133 @@ class LightRigCache(BaseCache):
             return
         
         self.node = targetNode
-        p = targetNode.getParameter("locations")
-        locationList = {}
-        for i, child in enumerate(p.getChildren()): 
-            if child.getValue(0) == "":
-                self.unused.append(i)
-            else:
-                locationList[child.getValue(0)] = i
-        
-        # process the list of locations
-        for location, i in locationList.iteritems():
-            self.cache[location] = {"index": i, "children": {}}
-        
-        for location in locationList.keys():
-            parent = os.path.dirname(location)
-            if parent=="":
-                continue
+        for info in self.readLocations(targetNode):
+            parent = info.parent
+            childName = info.segment
             # its parent is a light
-            childName = os.path.basename(location)
             if not self.addChildToParent(parent, childName, self.locationType):
                 if self.locationType == "light":
                     self.control.getRigCache().addChildToParent(parent, childName, self.locationType)
     
-    def addChildToParent(self, parentPath, childName, locationType):
-        if parentPath not in self.cache:
-            return False
-        children = self.cache[parentPath].get("children")
-        children[childName] = locationType
-        return True
-    
-
     #override
-    def recursiveRemoveLocation(self, parentPath, name):
-        try:
+    def removeLocationTree(self, parentPath, name):
+        cachePop = self.cache.pop
+        byIndexPop = self.byIndex.pop
+        addUnused = self.unused.add
+        removeLocationAtIndex = self.node.removeLocationAtIndex
+        removeSingleLocation = self.control.removeSingleLocation
+        myType = self.locationType
+        childCaches = self.getChildCaches()
+        # children of another type are handed to their cache when they are
+        # popped, so every location is visited in the same order as a
+        # recursive walk
+        stack = [(parentPath, name, myType)]
+        while stack:
+            parentPath, name, locationType = stack.pop()
+            if locationType != myType:
+                childCache = childCaches.get(locationType)
+                if childCache is not None:
+                    childCache.removeLocationTree(parentPath, name)
+                continue
             location = getLocationPath(parentPath, name)
-            lightInfo = self.cache.pop(location)
-            index = lightInfo.get("index")
-            self.unused.append(index)
-            self.node.removeLocationAtIndex(index)
-            self.control.removeSingleLocation(location)
-
-            children = lightInfo.get("children")
-            for childName, childType in children.iteritems():
-                if childType == self.locationType:
-                    self.recursiveRemoveLocation(location, childName)
-                else:
-                    childCache = self.control.getCacheOfLocationType(childType)
-                    if childCache:
-                        childCache.recursiveRemoveLocation(location, childName)
-        except:
-            import traceback
-            traceback.print_exc()
+            lightInfo = cachePop(location, None)
+            if lightInfo is None:
+                continue
+            index = lightInfo.index
+            byIndexPop(index, None)
+            addUnused(index)
+            removeLocationAtIndex(index)
+            removeSingleLocation(location)
+
+            children = lightInfo.children
+            for childName in reversed(children):
+                stack.append((location, childName, children[childName]))
 
 
     #override
     def recursiveRenameChildLocation(self, parentPath, children, newParentPath):
-        for childName, childType in children.iteritems():
-            location = getLocationPath(parentPath, childName)
-            newLocation = getLocationPath(newParentPath, childName)
-            if childType == self.locationType:
-                if location in self.cache:
-                    info = self.cache.pop(location)
-                    index = info.get("index")
-                    children = info.get("children") # children is a dictionary
-                    
-                    self.cache[newLocation] = info
-                    self.node.renameLocation(index, newLocation)
-                    self.control.renameSingleLocation(location, newLocation)
-                    self.recursiveRenameChildLocation(location, children, newLocation)
-            else:
-                childCache = self.control.getCacheOfLocationType(childType)
-                if childCache:
+        cache = self.cache
+        byIndex = self.byIndex
+        # the nodes are renamed once for the whole subtree
+        nodeRenames = []
+        renames = []
+        myType = self.locationType
+        childCaches = self.getChildCaches()
+        # children are pushed in reverse and handed to their cache when they
+        # are popped, so they are visited in order
+        stack = [(parentPath, newParentPath, childName, children[childName])
+                 for childName in reversed(children)]
+        while stack:
+            parentPath, newParentPath, childName, childType = stack.pop()
+            # the parents below the renamed location are never empty
+            location = parentPath + "/" + childName
+            newLocation = internLocation(newParentPath + "/" + childName)
+            if childType != myType:
+                childCache = childCaches.get(childType)
+                if childCache is not None:
                     childCache.renameLocation(location, newLocation)
+                continue
+            info = cache.pop(location, None)
+            if info is None:
+                continue
+            index = info.index
+            # only the parent changes, the segment stays the same
+            info.parent = newParentPath
+            cache[newLocation] = info
+            byIndex[index] = newLocation
+            nodeRenames.append((index, newLocation))
+            renames.append((location, newLocation))
+            # children is a dictionary
+            grandchildren = info.children
+            for grandchildName in reversed(grandchildren):
+                stack.append((location, newLocation, grandchildName, grandchildren[grandchildName]))
+
+        self.renameNodeLocations(nodeRenames, renames)
 
 
     def recursiveDuplicateLocation(self, srcLocation, dstLocation):
-        if srcLocation in self.cache:
-            srcIndex = self.cache[srcLocation].get("index")
-            dstIndex = self.getIndexForNewLocation()
+        cache = self.cache
+        byIndex = self.byIndex
+        getIndexForNewLocation = self.getIndexForNewLocation
+        duplicateSingleLocation = self.control.duplicateSingleLocation
+        # the node copies its data for the whole subtree in one call
+        duplicates = []
+        myType = self.locationType
+        childCaches = self.getChildCaches()
+        # children are pushed in reverse and handed to their cache when they
+        # are popped, so they are duplicated in order
+        stack = [(srcLocation, dstLocation, myType)]
+        while stack:
+            srcLocation, dstLocation, locationType = stack.pop()
+            if locationType != myType:
+                childCache = childCaches.get(locationType)
+                if childCache is not None:
+                    childCache.recursiveDuplicateLocation(srcLocation, dstLocation)
+                continue
+            if srcLocation not in cache:
+                continue
+            srcInfo = cache[srcLocation]
+            srcIndex = srcInfo.index
+            dstIndex = getIndexForNewLocation()
             # add new location to cache..
-            self.cache[dstLocation] = {"index": dstIndex, "children": self.cache[srcLocation].get("children").copy()}
+            dstLocation = internLocation(dstLocation)
+            cache[dstLocation] = CacheEntry(dstIndex, dstLocation, srcInfo.children.copy())
+            byIndex[dstIndex] = dstLocation
             # copy data
-            self.node.duplicateLocation(srcIndex, dstIndex, dstLocation)
-            self.control.duplicateSingleLocation(srcLocation, dstLocation) # duplicate other attributes
-
-            children = self.cache[srcLocation].get("children", {})
-            for name, locationType in children.iteritems():
-                childLocationSrc = getLocationPath(srcLocation, name)
-                childLocationDst = getLocationPath(dstLocation, name)
-                if locationType == self.locationType:
-                    self.recursiveDuplicateLocation(childLocationSrc, childLocationDst)
-                else:
-                    childCache = self.control.getCacheOfLocationType(locationType)
-                    if childCache:
-                        childCache.recursiveDuplicateLocation(childLocationSrc, childLocationDst)
-    
+            duplicates.append((srcIndex, dstIndex, dstLocation))
+            duplicateSingleLocation(srcLocation, dstLocation) # duplicate other attributes
 
-    def getChildren(self, parentPath):
-        if parentPath in self.cache:
-            return self.cache[parentPath].get("children").keys()
+            children = srcInfo.children
+            for name in reversed(children):
+                stack.append((srcLocation + "/" + name, dstLocation + "/" + name, children[name]))
+
+        self.duplicateNodeLocations(duplicates)
+    
 
     def addLocation(self, locationPath, index, isChild):
-        self.cache[locationPath] = {"index": index,   "children": {}}
+        locationPath = internLocation(locationPath)
+        self.cache[locationPath] = CacheEntry(index, locationPath)
+        self.byIndex[index] = locationPath
         if not self.node:
             self.node = self.control.initTargetNode(self.locationType)
         self.node.addLocationAtIndex(locationPath, index)
-    
-    def updateChildName(self, parentPath, newName, oldName, locationType):
-        if parentPath in self.cache:
-            children = self.cache[parentPath].get("children")
-            if oldName!=None and oldName in children:
-                del children[oldName]
-            if newName:
-                children[newName]=locationType
-            return True
-        return False
-
-    def removeChild(self, parentPath, childName):
-        if parentPath not in self.cache:
-            return False
-        children = self.cache[parentPath].get("children")
-        if childName in children:
-            del children[childName]
-            return True
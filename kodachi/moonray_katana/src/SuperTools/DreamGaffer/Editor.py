@@ -2,10 +2,10 @@
 # SPDX-License-Identifier: Apache-2.0
 
 import os
+from collections import deque
 from Katana import QtCore, QtWidgets, UI4, QT4Widgets, QT4FormWidgets, NodegraphAPI, QtGui, Decorators
 from Katana import Utils, Nodes3DAPI, Decorators, FormMaster, ScenegraphManager
 from UI4.Widgets.SceneGraphView.ColumnDataType import ColumnDataType
-from UI4.Widgets.SceneGraphView import SceneGraphLocationTranslation
 
 from Tabs import MaterialTab, ObjectTab, FilterTab
 from Node import SYNC_SELECTION_OFF, SYNC_SELECTION_OUT, SYNC_SELECTION_IN_OUT
@@ -13,21 +13,54 @@ from Node import SYNC_SELECTION_OFF, SYNC_SELECTION_OUT, SYNC_SELECTION_IN_OUT
 from InternalControl import InternalControl
 import Helper
 
+# the shader parameters holding the material of a light or light filter
+LIGHT_SHADER_PARAMS = frozenset(["moonrayLightShader", "moonrayLightfilterShader"])
+
+# (action name, text) of the DreamGaffer context menu items, None is a separator
+CONTEXT_MENU_ITEMS = [
+    ('Add Light', 'Add Light'),
+    ('Add Rig', 'Add Rig'),
+    ('Add Master Material', 'Add Master Material'),
+    ('Add Master Filter', 'Add Light Filter'),
+    None,
+    ('Delete', 'Delete'),
+    ('Edit', 'Edit'),
+    ('Duplicate', 'Duplicate'),
+]
+
 
 class DreamGafferEditor(QtWidgets.QWidget):
     def __init__(self, parent, node):
         try:
             QtWidgets.QWidget.__init__(self, parent)
             self.__mainNode = node
+            # the event ID of the node's sync selection events
+            self.__mainNodeHash = hash(node)
             self.__frozen = True
+            self.__handlersEnabled = False
             self.__updateOnIdle = False
             self.__systemSetValue = False
             self.__expansionState = None
             self.__oldRootLocation = None
             self.__oldSelectionState = None
+            self.__pendingSelections = []
+            self.__dragLocation = None
+            self.__dragTypeCache = {}
+            self.__contextMenuActions = None
             self.__selectedPath = None
             self.__currentLocation = None
             self.__currentLocationType = None
+            # (tab, fullpath, locationType) of the last reload, selecting the
+            # same location again doesn't reload the tab
+            self.__loadedSelection = None
+            # the scenegraph view is filled in once the editor is first shown,
+            # the internal control when it is first asked for
+            self.__initialized = False
+            self.__control = None
+            # the showIncomingScene value the scenegraph view shows
+            self.__viewedIncomingScene = None
+            # the role of each node edits come from, looked up once per batch
+            self.__editNodeRoles = None
 
             self.__lastRootLocation = self.__mainNode.getRootLocation()
             self.__redoStackSize = 0
@@ -73,11 +106,6 @@ class DreamGafferEditor(QtWidgets.QWidget):
             self.__tabsPanel.layout().addWidget(self.__tabWidget)
             self.__setupTabs()
             
-            self.__sceneGraphView.setLocationActive(self.__lastRootLocation)
-            # update viewed node
-            self.__showIncomingSceneEvent()
-            self.__control = self.__mainNode.buildInternalControl()
-            
             self.registerKeyboardShortcuts()
             from UI4.App.KeyboardShortcutManager import BindActions
             BindActions(self.getSuperToolName(), self.__sceneGraphViewWidget, self)
@@ -95,11 +123,18 @@ class DreamGafferEditor(QtWidgets.QWidget):
         if redoSize == self.__redoStackSize:
             return
         
-        name = Utils.UndoStack.GetNextRedoName()
-        if name and name.startswith("DreamGaffer"):
-            self.__control.clearCache()
-            self.__control.buildInternalCache()
-            print self.__control.lightCache.cache
+        # an undo or redo can change what the tabs show
+        self.__loadedSelection = None
+        if self.__control is not None:
+            if redoSize > self.__redoStackSize:
+                # an undo, the next redo is the action that was just undone
+                name = Utils.UndoStack.GetNextRedoName()
+                if name and name.startswith("DreamGaffer"):
+                    self.__control.rebuildCacheForAction(name)
+            else:
+                # a redo, or a new action that cleared the redo stack. the next
+                # redo name isn't the redone action, so everything is rebuilt
+                self.__control.rebuildCacheForAction(None)
         self.__redoStackSize = redoSize
 
 
@@ -118,63 +153,37 @@ class DreamGafferEditor(QtWidgets.QWidget):
     @classmethod
     def registerKeyboardShortcuts(self):
         from UI4.App.KeyboardShortcutManager import RegisterAction, GetActionID
-        actionName = 'Add Light'
-        actionID = GetActionID(self.getSuperToolName(), actionName)
-        if not actionID:
-            name = '%s.%s' % (self.getSuperToolName(), actionName)
-            RegisterAction(hash(name), name, "L", self.__addLight)
-
-        actionName = 'Add Rig'
-        actionID = GetActionID(self.getSuperToolName(), actionName)
-        if not actionID:
-            name = '%s.%s' % (self.getSuperToolName(), actionName)
-            RegisterAction(hash(name), name, "R", self.__addRig)
-
-        actionName = 'Add Master Material'
-        actionID = GetActionID(self.getSuperToolName(), actionName)
-        if not actionID:
-            name = '%s.%s' % (self.getSuperToolName(), actionName)
-            RegisterAction(hash(name), name, "M", self.__addMaterial)
-        
-        actionName = 'Add Master Filter'
-        actionID = GetActionID(self.getSuperToolName(), actionName)
-        if not actionID:
-            name = '%s.%s' % (self.getSuperToolName(), actionName)
-            RegisterAction(hash(name), name, "F", self.__addFilter)
-
-        actionName = 'Delete'
-        actionID = GetActionID(self.getSuperToolName(), actionName)
-        if not actionID:
-            name = '%s.%s' % (self.getSuperToolName(), actionName)
-            RegisterAction(hash(name), name, "Del", self.__deleteLocations)
-        
-        actionName = 'Edit'
-        actionID = GetActionID(self.getSuperToolName(), actionName)
-        if not actionID:
-            name = '%s.%s' % (self.getSuperToolName(), actionName)
-            RegisterAction(hash(name), name, "E", self.__editLocations)
-        
-        actionName = 'Duplicate'
-        actionID = GetActionID(self.getSuperToolName(), actionName)
-        if not actionID:
-            name = '%s.%s' % (self.getSuperToolName(), actionName)
-            RegisterAction(hash(name), name, "D", self.__duplicateLocation)
-        
+        toolName = self.getSuperToolName()
+        for actionName, shortcut, callback in [
+                ('Add Light', "L", self.__addLight),
+                ('Add Rig', "R", self.__addRig),
+                ('Add Master Material', "M", self.__addMaterial),
+                ('Add Master Filter', "F", self.__addFilter),
+                ('Delete', "Del", self.__deleteLocations),
+                ('Edit', "E", self.__editLocations),
+                ('Duplicate', "D", self.__duplicateLocation)]:
+            if GetActionID(toolName, actionName):
+                continue
+            name = '%s.%s' % (toolName, actionName)
+            RegisterAction(hash(name), name, shortcut, callback)
 
     def __dragMoveEventCallback(self, dragMoveEvent, draggedItems, parentItem, childItemIndex):
         if dragMoveEvent.source() != self.__sceneGraphView.getWidget():
             return
         else:
             locationPath = draggedItems[0].getLocationPath()
-            attrs = self.__sceneGraphView.getSceneGraphAttributes(locationPath)
-            locationType = attrs.getChildByName("type").getValue()
+            if locationPath != self.__dragLocation:
+                # a new drag, the types seen by the last one may be stale
+                self.__dragLocation = locationPath
+                self.__dragTypeCache = {}
 
             if parentItem is None:
                 dragMoveEvent.accept()
             else:
-                parentLocation = parentItem.getLocationPath()
-                attrs = self.__sceneGraphView.getSceneGraphAttributes(parentLocation)
-                parentLocationType = attrs.getChildByName("type").getValue()
+                # move events keep coming over the same items, their types
+                # are looked up once per drag
+                locationType = self.__getLocationType(locationPath, self.__dragTypeCache)
+                parentLocationType = self.__getLocationType(parentItem.getLocationPath(), self.__dragTypeCache)
 
                 if locationType == parentLocationType:
                     dragMoveEvent.accept()
@@ -182,37 +191,48 @@ class DreamGafferEditor(QtWidgets.QWidget):
                     dragMoveEvent.accept()
     
     def __dropEventCallback(self, dropEvent, droppedItems, parentItem, childItemIndex):
+        self.__dragLocation = None
+        self.__dragTypeCache = {}
         if dropEvent.source() != self.__sceneGraphView.getWidget():
             return
         else:
             droppedItem = droppedItems[0]
             fullpath = droppedItem.getLocationPath()
-            oldparentPath = os.path.dirname(fullpath)
+            oldparentPath, name = Helper.splitPath(fullpath)
             oldLocation = self.getRelativePathToRoot(fullpath)
+            # the new and old parents are often the same location
+            typeCache = {}
 
             newParentType = None
             oldParentType = None
-            name = os.path.basename(fullpath)
             newLocation = name
             if parentItem:
                 parentLocation = parentItem.getLocationPath()
-                attrs = self.__sceneGraphView.getSceneGraphAttributes(parentLocation)
-                newParentType = attrs.getChildByName("type").getValue()
+                newParentType = self.__getLocationType(parentLocation, typeCache)
                 newLocation = self.getRelativePathToRoot(parentLocation + "/" + name)
         
             if newLocation == oldLocation:
                 return
 
-            attrs = self.__sceneGraphView.getSceneGraphAttributes(fullpath)
-            locationType = attrs.getChildByName("type").getValue()
+            locationType = self.__getLocationType(fullpath, typeCache)
             if not self.__acceptDrop(locationType, newParentType):
                 return
-            if oldparentPath != self.__rootLocPolicy.getValue():
-                attrs = self.__sceneGraphView.getSceneGraphAttributes(oldparentPath)
-                oldParentType = attrs.getChildByName("type").getValue()
+            if oldparentPath != self.__rootLocation:
+                oldParentType = self.__getLocationType(oldparentPath, typeCache)
 
-            self.__control.move(oldLocation, newLocation, locationType, oldParentType, newParentType)
+            self.getInternalControl().move(oldLocation, newLocation, locationType, oldParentType, newParentType)
                 
+    def __getLocationType(self, locationPath, typeCache=None):
+        # typeCache is a dict a handler can pass to look up each path once
+        if typeCache is not None and locationPath in typeCache:
+            return typeCache[locationPath]
+        attrs = self.__sceneGraphView.getSceneGraphAttributes(locationPath)
+        typeAttr = attrs.getChildByName("type") if attrs else None
+        locationType = typeAttr.getValue() if typeAttr else None
+        if typeCache is not None:
+            typeCache[locationPath] = locationType
+        return locationType
+
     def __acceptDrop(self, locationType, parentLocationType):
         if parentLocationType == None:
             return True
@@ -224,7 +244,7 @@ class DreamGafferEditor(QtWidgets.QWidget):
 
     def __tabChanged(self, int):
         Utils.UndoStack.DisableCapture()
-        self.__tabWidget.currentWidget().reloadTab(self.__selectedPath, self.__currentLocation, self.__currentLocationType)
+        self.__getCurrentTab().reloadTab(self.__selectedPath, self.__currentLocation, self.__currentLocationType)
         Utils.UndoStack.EnableCapture()
 
 
@@ -232,7 +252,9 @@ class DreamGafferEditor(QtWidgets.QWidget):
         # rootLocation
         toolbarLayout = QtWidgets.QVBoxLayout()
         self.layout().addLayout(toolbarLayout)
-        self.__rootLocPolicy = QT4FormWidgets.PythonValuePolicy('', {'': self.__mainNode.getRootLocation()}, 
+        # the value of the root location policy, kept up to date by its callback
+        self.__rootLocation = self.__mainNode.getRootLocation()
+        self.__rootLocPolicy = QT4FormWidgets.PythonValuePolicy('', {'': self.__rootLocation}, 
                              childHintDict={'': {'widget': 'scenegraphLocation',
                                                 'label': 'topLocation'}}).getChildByName('')
         self.__rootLocPolicy.addCallback(self.__rootLocationPolicyEvent)
@@ -266,18 +288,60 @@ class DreamGafferEditor(QtWidgets.QWidget):
         """
         Handler for changes to the B{Sync Selection} parameter.
         """
-        self.__mainNode.setSyncSelection(event.getPolicy().getValue())
-        if self.__mainNode.getSyncSelection() > SYNC_SELECTION_OFF:
-            Utils.EventModule.QueueEvent('dreamGaffer_syncOutgoingSelection', hash(self.__mainNode))
+        value = event.getPolicy().getValue()
+        if value == self.__mainNode.getSyncSelection():
+            # nothing changed, don't send the selection out again
+            return
+        self.__mainNode.setSyncSelection(value)
+        if value > SYNC_SELECTION_OFF:
+            Utils.EventModule.QueueEvent('dreamGaffer_syncOutgoingSelection', self.__mainNodeHash)
 
     def __setupTabs(self):
         self.objectTab = ObjectTab.ObjectTab(self, self.__mainNode)
-        self.materialTab = MaterialTab.MaterialTab(self, self.__mainNode)
-        self.filterTab = FilterTab.FilterTab(self, self.__mainNode)
+        # the material tab is built the first time it is shown, a placeholder
+        # holds its place until then. the light filter tab isn't shown yet
+        self.materialTab = None
+        self.filterTab = None
+        self.__materialPlaceholder = QtWidgets.QWidget()
         self.__tabWidget.addTab(self.objectTab, "Object")
-        self.__tabWidget.addTab(self.materialTab, "Material")
+        self.__tabWidget.addTab(self.__materialPlaceholder, "Material")
         #self.__tabWidget.addTab(self.filterTab, "Light Filter")
 
+    def __getMaterialTab(self):
+        if self.materialTab is None:
+            index = self.__tabWidget.indexOf(self.__materialPlaceholder)
+            currentIndex = self.__tabWidget.currentIndex()
+            self.materialTab = MaterialTab.MaterialTab(self, self.__mainNode)
+            self.materialTab.setDirty(True)
+            self.__tabWidget.blockSignals(True)
+            self.__tabWidget.removeTab(index)
+            self.__tabWidget.insertTab(index, self.materialTab, "Material")
+            self.__tabWidget.setCurrentIndex(currentIndex)
+            self.__tabWidget.blockSignals(False)
+            self.__materialPlaceholder.deleteLater()
+            self.__materialPlaceholder = None
+        return self.materialTab
+
+    def __getCurrentTab(self):
+        tab = self.__tabWidget.currentWidget()
+        if tab is not None and tab is self.__materialPlaceholder:
+            tab = self.__getMaterialTab()
+        return tab
+
+    def __setTabsDirty(self):
+        for tab in (self.objectTab, self.materialTab, self.filterTab):
+            if tab is not None:
+                tab.setDirty(True)
+
+    def __reloadCurrentTab(self):
+        # every tab is marked dirty but only the shown one is reloaded, the
+        # others reload when they are switched to
+        self.__setTabsDirty()
+        tab = self.__getCurrentTab()
+        self.__loadedSelection = None
+        tab.reloadTab(self.__selectedPath, self.__currentLocation, self.__currentLocationType)
+        self.__loadedSelection = (tab, self.__selectedPath, self.__currentLocationType)
+
     def __configureSceneGraphView(self):
         self.__sceneGraphView.beginColumnConfiguration()
         nameColumn = self.__sceneGraphView.getColumnByName('Name')
@@ -325,7 +389,6 @@ class DreamGafferEditor(QtWidgets.QWidget):
         #nameItemDelegate = treeWidget.itemDelegateForColumn(self.__sceneGraphView.getColumnByName('Name').getIndex())
 
         self.__sceneGraphView.setContextMenuEventCallback(self.__contextMenuEventHandler)
-        self.__sceneGraphView.getSceneGraphChildren(self.__lastRootLocation, self.__rootChildrenChangedCallback)
         self.__sceneGraphView.setSelectionChangedCallback(self.__selectionChangedHandler)
 
         #self.__sceneGraphView.setLocationAddedOrUpdatedCallback(self.__locationAddedOrUpdatedCallback)
@@ -339,7 +402,12 @@ class DreamGafferEditor(QtWidgets.QWidget):
     
     def __showIncomingSceneEvent(self, *args, **kwds):
         value = self.__showIncomingPolicy.getValue()
-        self.__mainNode.getParameter("showIncomingScene").setValue(value, 0)
+        param = self.__mainNode.getParameter("showIncomingScene")
+        if param.getValue(0) != value:
+            param.setValue(value, 0)
+        if value == self.__viewedIncomingScene:
+            return
+        self.__viewedIncomingScene = value
         if value == 1:
             self.__sceneGraphView.setViewNode(self.__mainNode.getViewIncomingNode())
         else:
@@ -376,18 +444,25 @@ class DreamGafferEditor(QtWidgets.QWidget):
         @param oldRootLocation: The path to the old root location, before it
             was changed.
         """
-        self.__oldSelectionState = list(self.__sceneGraphView.getSelectedLocations())
+        self.__oldSelectionState = set(self.__sceneGraphView.getSelectedLocations())
         self.__sceneGraphView.clearExpandedLocationsRegistry()
         self.__expansionState = self.__sceneGraphView.saveExpandedLocations()
         self.__oldRootLocation = oldRootLocation
 
+    def __getOldRootPath(self, locationPath, currentRootLocation):
+        # the path the location had under the root before it was changed,
+        # only the leading root is swapped
+        if locationPath.startswith(currentRootLocation):
+            return self.__oldRootLocation + locationPath[len(currentRootLocation):]
+        return locationPath
+
     def __restoreExpansionStateFor(self, locationPath, topLevelLocation):
         if self.__expansionState is None:
             return
         else:
             currentRootLocation = self.__mainNode.getRootLocation()
-            oldPath = locationPath.replace(currentRootLocation, self.__oldRootLocation)
-            oldTopLevelPath = topLevelLocation.replace(currentRootLocation, self.__oldRootLocation)
+            oldPath = self.__getOldRootPath(locationPath, currentRootLocation)
+            oldTopLevelPath = self.__getOldRootPath(topLevelLocation, currentRootLocation)
             testLocation = (
              oldPath, oldTopLevelPath)
             if testLocation in self.__expansionState:
@@ -402,70 +477,87 @@ class DreamGafferEditor(QtWidgets.QWidget):
             return
         else:
             currentRootLocation = self.__mainNode.getRootLocation()
-            oldPath = locationPath.replace(currentRootLocation, self.__oldRootLocation)
-            oldTopLevelPath = topLevelLocation.replace(currentRootLocation, self.__oldRootLocation)
+            oldPath = self.__getOldRootPath(locationPath, currentRootLocation)
+            oldTopLevelPath = self.__getOldRootPath(topLevelLocation, currentRootLocation)
             testLocation = (
              oldTopLevelPath, oldPath)
             if testLocation in self.__oldSelectionState:
-                self.__sceneGraphView.setSelectionState(topLevelLocation, locationPath, True)
+                self.__queueSelection(topLevelLocation, locationPath)
                 self.__oldSelectionState.remove(testLocation)
             if len(self.__oldSelectionState) == 0:
                 self.__oldSelectionState = None
             return
 
+    def __queueSelection(self, topLevelLocation, locationPath):
+        # locations are restored one callback at a time, their selection is
+        # applied in one call once the callbacks are done
+        if not self.__pendingSelections:
+            QtCore.QTimer.singleShot(0, self.__flushPendingSelections)
+        self.__pendingSelections.append((topLevelLocation, locationPath))
+
+    def __flushPendingSelections(self):
+        pendingSelections = self.__pendingSelections
+        self.__pendingSelections = []
+        if pendingSelections:
+            self.__sceneGraphView.selectLocations(pendingSelections, replaceSelection=False)
+
     def __rootChildrenChangedCallback(self, locationPath, children):
         currentRootLocation = self.__mainNode.getRootLocation()
         if locationPath != currentRootLocation:
             self.__updateCurrentItem()
             return False
-        self.__restoreTopLevelLocations(children, currentRootLocation)
-        self.__updateCurrentItem()
+        # the view repaints once after the top level locations and the
+        # selection are both restored
+        self.__sceneGraphViewWidget.setUpdatesEnabled(False)
+        try:
+            self.__restoreTopLevelLocations(children, currentRootLocation)
+            self.__updateCurrentItem()
+        finally:
+            self.__sceneGraphViewWidget.setUpdatesEnabled(True)
         return True
 
     def __restoreTopLevelLocations(self, children, currentRootLocation):
-        topLevelLocationPaths = [ '%s/%s' % (currentRootLocation, childName) for childName in children
-                                ]
+        rootPrefix = currentRootLocation + "/"
+        topLevelLocationPaths = [rootPrefix + childName for childName in children]
         self.__sceneGraphView.setTopLevelLocations(topLevelLocationPaths)
 
     def __rootLocationPolicyEvent(self, *args, **kwds):
         rootLocationPath = self.__rootLocPolicy.getValue()
+        self.__rootLocation = rootLocationPath
         oldRootLocationPath = self.__mainNode.getRootLocation()
-        self.__mainNode.getParameter("rootLocation").setValue(rootLocationPath, 0)
         if oldRootLocationPath != rootLocationPath:
+            self.__mainNode.getParameter("rootLocation").setValue(rootLocationPath, 0)
             self.__saveCurrentSelectionAndExpansionState(oldRootLocationPath)
         self.__sceneGraphView.getSceneGraphChildren(rootLocationPath, self.__rootChildrenChangedCallback)
 
 
     def __updateCurrentItem(self):
         selectedLocations = self.__sceneGraphView.getSelectedLocations()
-        for topLevelLocationPath, locationPath in selectedLocations:
-            self.__sceneGraphView.setSelectionState(topLevelLocationPath, locationPath, True)
+        if selectedLocations:
+            # reselect everything in one call instead of one call per location
+            self.__sceneGraphView.selectLocations(list(selectedLocations), replaceSelection=True)
 
     def __contextMenuEventHandler(self, contextMenuEvent, menu):
         self.__populateStandardContextMenuItems(menu)
     
     def __populateStandardContextMenuItems(self, menu):
-        from UI4.App.KeyboardShortcutManager import CreateAction, GetActionID
+        if self.__contextMenuActions is None:
+            # the actions don't depend on the menu, they are created on the
+            # first menu and added to every menu after that
+            from UI4.App.KeyboardShortcutManager import CreateAction, GetActionID
+            toolName = self.getSuperToolName()
+            self.__contextMenuActions = [
+                CreateAction(GetActionID(toolName, item[0]), self.__sceneGraphViewWidget, text=item[1]) if item else None
+                for item in CONTEXT_MENU_ITEMS]
 
         sgvActions = menu.actions()
         for action in sgvActions:
             menu.removeAction(action)
-        action = CreateAction(GetActionID(self.getSuperToolName(), 'Add Light'), self.__sceneGraphViewWidget, text='Add Light')
-        menu.addAction(action)
-        action = CreateAction(GetActionID(self.getSuperToolName(), 'Add Rig'), self.__sceneGraphViewWidget, text='Add Rig')
-        menu.addAction(action)
-        action = CreateAction(GetActionID(self.getSuperToolName(), 'Add Master Material'), self.__sceneGraphViewWidget, text='Add Master Material')
-        menu.addAction(action)
-        action = CreateAction(GetActionID(self.getSuperToolName(), 'Add Master Filter'), self.__sceneGraphViewWidget, text='Add Light Filter')
-        menu.addAction(action)
-        menu.addSeparator()
-        action = CreateAction(GetActionID(self.getSuperToolName(), 'Delete'), self.__sceneGraphViewWidget, text='Delete')
-        menu.addAction(action)    
-
-        action = CreateAction(GetActionID(self.getSuperToolName(), 'Edit'), self.__sceneGraphViewWidget, text='Edit')
-        menu.addAction(action)
-        action = CreateAction(GetActionID(self.getSuperToolName(), 'Duplicate'), self.__sceneGraphViewWidget, text='Duplicate')
-        menu.addAction(action)
+        for action in self.__contextMenuActions:
+            if action is None:
+                menu.addSeparator()
+            else:
+                menu.addAction(action)
 
         menu.addSeparator()
         
@@ -478,9 +570,14 @@ class DreamGafferEditor(QtWidgets.QWidget):
     def getRelativePathToRoot(self, path):
         if path == "":
             return path
-        if path == self.__rootLocPolicy.getValue():
+        rootPath = self.__rootLocation
+        if path == rootPath:
             return ""
-        return os.path.relpath(path, self.__rootLocPolicy.getValue())
+        # scenegraph paths under the root only need the prefix stripped
+        rootPrefix = rootPath + "/"
+        if path.startswith(rootPrefix):
+            return path[len(rootPrefix):]
+        return os.path.relpath(path, rootPath)
 
     def getFirstSelectedLoation(self):
         selectedLocations = self.__sceneGraphView.getSelectedLocations()
@@ -496,55 +593,62 @@ class DreamGafferEditor(QtWidgets.QWidget):
 
     @Decorators.undogroup('DreamGaffer Delete locations')
     def __deleteLocations(self):
-        locations = self.getSelectedLocations()
-        for fullpath in locations:
-            parentPath = os.path.dirname(fullpath)
-            attrs = self.__sceneGraphView.getSceneGraphAttributes(fullpath)
-            locationType = attrs.getChildByName("type").getValue()
-            self.__control.removeLocation(self.getRelativePathToRoot(parentPath), self.getRelativePathToRoot(fullpath), locationType)
+        removals = []
+        for fullpath in self.getSelectedLocations():
+            parentPath = Helper.splitPath(fullpath)[0]
+            locationType = self.__getLocationType(fullpath)
+            removals.append((self.getRelativePathToRoot(parentPath), self.getRelativePathToRoot(fullpath), locationType))
+        self.getInternalControl().removeLocations(removals)
     
     @Decorators.undogroup('DreamGaffer Duplicate locations')
     def __duplicateLocation(self):
         try:
             locations = self.getSelectedLocations()
+            control = self.getInternalControl()
             for fullpath in locations:
-                attrs = self.__sceneGraphView.getSceneGraphAttributes(fullpath)
-                locationType = attrs.getChildByName("type").getValue()
+                locationType = self.__getLocationType(fullpath)
                 location = self.getRelativePathToRoot(fullpath)
-                if self.__control.locationExists(location, locationType):
-                    #print self.__control.lightCache.cache
-                    print "duplicate location"
-                    print location
-                    print self.__control.getCacheOfLocationType(locationType).cache
-                    self.__control.duplicateLocation(location, locationType)
+                if control.locationExists(location, locationType):
+                    if Helper.DEBUG:
+                        print("duplicate location " + location)
+                        print(control.getCacheOfLocationType(locationType))
+                    control.duplicateLocation(location, locationType)
                 else:
-                    basename = os.path.basename(fullpath) + "_copy"
+                    parentFullPath, name = Helper.splitPath(fullpath)
+                    basename = name + "_copy"
                     parentType = None
-                    parentPath = self.getRelativePathToRoot(os.path.dirname(fullpath))
+                    parentPath = self.getRelativePathToRoot(parentFullPath)
                     self.__duplicateUpstreamLocation(fullpath, parentType, basename, parentPath)
         except:
             import traceback
             traceback.print_exc()
 
     def __duplicateUpstreamLocation(self,  fullpath, parentType, basename, parentPath):
+        # walk the upstream hierarchy with a queue, each location is queried
+        # once and its children are queued under the name of its copy
         try:
-            attrs = self.__sceneGraphView.getSceneGraphAttributes(fullpath)
-            if not attrs:
-                print "%s: has no attrs" %fullpath
-            else:
+            queue = deque([(fullpath, parentType, basename, parentPath)])
+            while queue:
+                fullpath, parentType, basename, parentPath = queue.popleft()
+                attrs = self.__sceneGraphView.getSceneGraphAttributes(fullpath)
+                if not attrs:
+                    if Helper.DEBUG:
+                        print("%s: has no attrs" % fullpath)
+                    continue
                 locationType = attrs.getChildByName("type").getValue()
                 
-                name = self.__control.duplicateIncomingLocation(parentPath, basename, parentType, locationType, attrs)
+                name = self.getInternalControl().duplicateIncomingLocation(parentPath, basename, parentType, locationType, attrs)
+                if name is None:
+                    # the copy failed, its children have nowhere to go
+                    continue
 
-                children = self.__sceneGraphView.getSceneGraphChildren(fullpath)
                 if parentPath!="":
                     newParentPath = parentPath + "/" + name
                 else:
                     newParentPath = name
                 
-                for child in children:
-                    childfullpath = fullpath + "/" + child
-                    self.__duplicateUpstreamLocation(childfullpath, locationType, child, newParentPath)
+                for child in self.__sceneGraphView.getSceneGraphChildren(fullpath):
+                    queue.append((fullpath + "/" + child, locationType, child, newParentPath))
         except:
             import traceback
             traceback.print_exc()
@@ -555,16 +659,14 @@ class DreamGafferEditor(QtWidgets.QWidget):
         locations = self.getSelectedLocations()
         for fullpath in locations:
             location = self.getRelativePathToRoot(fullpath)
-            self.__control.editLocation(location)
+            self.getInternalControl().editLocation(location)
             attrs = self.__sceneGraphView.getSceneGraphAttributes(fullpath)
-            if attrs.getChildByName("xform.matrix"):
-                matrix = attrs.getChildByName("xform.matrix").getNearestSample(0)
+            matrixAttr = attrs.getChildByName("xform.matrix")
+            if matrixAttr:
+                matrix = matrixAttr.getNearestSample(0)
                 self.__mainNode.getDownstreamEditNode().setXformWithMatrix(location, matrix)
             
-        self.objectTab.setDirty(True)
-        self.materialTab.setDirty(True) 
-        self.filterTab.setDirty(True)
-        self.__tabWidget.currentWidget().reloadTab(self.__selectedPath, self.__currentLocation, self.__currentLocationType)
+        self.__reloadCurrentTab()
 
     @Decorators.undogroup('DreamGaffer Add light')
     def __addLight(self):
@@ -577,7 +679,7 @@ class DreamGafferEditor(QtWidgets.QWidget):
                 if self.__currentLocationType in ["light", "rig"]:
                     parentPath = self.__currentLocation
                     parentType = self.__currentLocationType
-            self.__control.addLocation(parentPath, basename, parentType, locationType)
+            self.getInternalControl().addLocation(parentPath, basename, parentType, locationType)
         except:
             #print self.__control.lightCache.cache
             import traceback
@@ -593,7 +695,7 @@ class DreamGafferEditor(QtWidgets.QWidget):
             if self.__currentLocationType == "rig":
                 parentPath = self.__currentLocation
                 parentType = self.__currentLocationType
-        self.__control.addLocation(parentPath, basename, parentType, locationType)
+        self.getInternalControl().addLocation(parentPath, basename, parentType, locationType)
 
     @Decorators.undogroup('DreamGaffer Add material')
     def __addMaterial(self):
@@ -606,7 +708,7 @@ class DreamGafferEditor(QtWidgets.QWidget):
             if self.__currentLocationType == "material":
                 parentPath = self.__currentLocation
                 parentType = self.__currentLocationType
-        self.__control.addLocation(parentPath, basename, parentType, locationType)
+        self.getInternalControl().addLocation(parentPath, basename, parentType, locationType)
     
     '''
     @Decorators.undogroup('DreamGaffer Add filter')
@@ -619,7 +721,7 @@ class DreamGafferEditor(QtWidgets.QWidget):
             if self.__currentLocationType == "light filter":
                 parentPath = self.__currentLocation
                 parentType = self.__currentLocationType
-        self.__control.addLocation(parentPath, basename, parentType, locationType)
+        self.getInternalControl().addLocation(parentPath, basename, parentType, locationType)
     '''
 
     @Decorators.undogroup('DreamGaffer Add filter')
@@ -632,7 +734,7 @@ class DreamGafferEditor(QtWidgets.QWidget):
             if self.__currentLocationType == "light filter" or self.__currentLocationType == "light":
                 parentPath = self.__currentLocation
                 parentType = self.__currentLocationType
-        self.__control.addLocation(parentPath, basename, parentType, locationType)
+        self.getInternalControl().addLocation(parentPath, basename, parentType, locationType)
 
 
     def __updateRootLocation(self, currentRoot):
@@ -652,34 +754,55 @@ class DreamGafferEditor(QtWidgets.QWidget):
                 return
             rootPath = self.__mainNode.getRootLocation()
             locationsPaths = set(scenegraph.getSelectedLocations())
-            scopedLocations = set(path for path in locationsPaths if path != rootPath and SceneGraphLocationTranslation.IsLocationUnderTopLevelLocation(path, rootPath))
+            # the locations below the root, the root itself isn't shown
+            rootPrefix = rootPath + '/'
+            scopedLocations = set(path for path in locationsPaths if path.startswith(rootPrefix))
             if not scopedLocations:
                 return
-            self.__sceneGraphView.setSelectionChangedCallback(None)
             selectedLocations = self.__sceneGraphView.getSelectedLocations()
-            locationsPaths = set(locationPath for topLevelLocationPath, locationPath in selectedLocations)                
-            newlySelected = scopedLocations.difference(locationsPaths)
-            newlyUnselected = locationsPaths.difference(scopedLocations)
-
-            for locationPath in newlyUnselected:
-                self.__sceneGraphView.setSelectionState(None, locationPath, False)
-
-            rootTokens = rootPath.split('/')
-            for locationPath in newlySelected:
-                locationTokens = locationPath.split('/')
-                topLevelLocationPath = ('/').join(locationTokens[:len(rootTokens) + 1])
-                for i in xrange(len(rootTokens) + 1, len(locationTokens)):
-                    self.__sceneGraphView.setLocationExpanded(topLevelLocationPath, ('/').join(locationTokens[:i]))
+            locationsPaths = set(locationPath for topLevelLocationPath, locationPath in selectedLocations)
+            changedLocations = scopedLocations.symmetric_difference(locationsPaths)
+            if not changedLocations:
+                # the editor already shows this selection
+                return
+            newlySelected = changedLocations.intersection(scopedLocations)
+            self.__sceneGraphView.setSelectionChangedCallback(None)
+            # the view repaints once after the whole selection is changed
+            self.__sceneGraphViewWidget.setUpdatesEnabled(False)
+            try:
+                for locationPath in changedLocations.intersection(locationsPaths):
+                    self.__sceneGraphView.setSelectionState(None, locationPath, False)
+
+                # selected siblings share their ancestors, each ancestor is
+                # expanded once and before its children
+                expandedLocations = []
+                seenLocations = set()
+                topLevelDepth = len(rootPath.split('/')) + 1
+                for locationPath in newlySelected:
+                    locationTokens = locationPath.split('/')
+                    topLevelLocationPath = ('/').join(locationTokens[:topLevelDepth])
+                    # each ancestor path extends the previous one by a token
+                    ancestorPath = topLevelLocationPath
+                    for token in locationTokens[topLevelDepth:]:
+                        if ancestorPath not in seenLocations:
+                            seenLocations.add(ancestorPath)
+                            expandedLocations.append((topLevelLocationPath, ancestorPath))
+                        ancestorPath += '/' + token
+
+                for topLevelLocationPath, ancestorPath in expandedLocations:
+                    self.__sceneGraphView.setLocationExpanded(topLevelLocationPath, ancestorPath)
+                for locationPath in newlySelected:
+                    self.__sceneGraphView.setSelectionState(None, locationPath, True)
+            finally:
+                self.__sceneGraphViewWidget.setUpdatesEnabled(True)
 
-                self.__sceneGraphView.setSelectionState(None, locationPath, True)
-            
             self.__selectionChangedHandler(syncSelection=False)
             self.__sceneGraphView.setSelectionChangedCallback(self.__selectionChangedHandler)
 
     def __selectionChangedHandler(self, syncSelection=True):
         self.onSelectionChanged()
         if syncSelection and self.__mainNode.getSyncSelection() > SYNC_SELECTION_OFF:
-            Utils.EventModule.QueueEvent('dreamGaffer_syncOutgoingSelection', hash(self.__mainNode))
+            Utils.EventModule.QueueEvent('dreamGaffer_syncOutgoingSelection', self.__mainNodeHash)
 
     def __syncSelectionEvent(self, args):
         """
@@ -690,35 +813,44 @@ class DreamGafferEditor(QtWidgets.QWidget):
             eventType, a hashable value with the eventID, and a C{dict} with
             additional keyword arguments.
         """
-        for arg in args:
-            if arg[1] == hash(self.__mainNode):
-                scenegraph = ScenegraphManager.getActiveScenegraph()
-                paths = [ locationPath for _topLevelLocationPath, locationPath in self.__sceneGraphView.getSelectedLocations()
-                        ]
-                if not scenegraph or not paths:
-                    continue
-                for path in paths:
-                    scenegraph.ensureLocationVisible(path)
-
-                scenegraph.addSelectedLocations(paths, True)
+        # the handler is registered for the events of this node only, and
+        # the collapsed events all ask for the same selection to be sent
+        if not args:
+            return
+        selectedLocations = self.__sceneGraphView.getSelectedLocations()
+        if not selectedLocations:
+            return
+        scenegraph = ScenegraphManager.getActiveScenegraph()
+        if not scenegraph:
+            return
+        paths = [locationPath for _topLevelLocationPath, locationPath in selectedLocations]
+        # making a location visible expands its ancestors, one location per
+        # parent is enough for its siblings to be visible as well
+        visibleParents = set()
+        for path in paths:
+            parentPath = Helper.splitPath(path)[0]
+            if parentPath not in visibleParents:
+                visibleParents.add(parentPath)
+                scenegraph.ensureLocationVisible(path)
+
+        scenegraph.addSelectedLocations(paths, True)
 
     def onSelectionChanged(self):
+        location = self.getFirstSelectedLoation()
+        if not location:
+            self.__selectedPath = None
+            self.__currentLocation = None
+            self.__currentLocationType = None
+            return
+        self.__currentLocationType = self.__getLocationType(location)
+        self.__currentLocation = self.getRelativePathToRoot(location)
+        self.__selectedPath = location
+        if self.__loadedSelection == (self.__tabWidget.currentWidget(), location, self.__currentLocationType):
+            # the current tab already shows this location
+            return
         Utils.UndoStack.DisableCapture()
         try:
-            location = self.getFirstSelectedLoation()
-            if not location:
-                self.__selectedPath = None
-                self.__currentLocation = None
-                self.__currentLocationType = None
-                return
-            attrs = self.__sceneGraphView.getSceneGraphAttributes(location)
-            self.__currentLocationType = attrs.getChildByName("type").getValue()
-            self.__currentLocation = self.getRelativePathToRoot(location)
-            self.__selectedPath = location
-            self.objectTab.setDirty(True)
-            self.materialTab.setDirty(True)
-            self.filterTab.setDirty(True)
-            self.__tabWidget.currentWidget().reloadTab(self.__selectedPath, self.__currentLocation, self.__currentLocationType)
+            self.__reloadCurrentTab()
         except:
             import traceback
             traceback.print_exc()
@@ -727,54 +859,107 @@ class DreamGafferEditor(QtWidgets.QWidget):
 
     def reloadMaterialTab(self):
         #print "reloadMaterialTab"
-        self.materialTab.reloadTab(self.__selectedPath, self.__currentLocation, self.__currentLocationType)
+        # callers read the proxy material node right after this, so the tab
+        # is built and loaded even when it isn't shown
+        tab = self.__getMaterialTab()
+        tab.setDirty(True)
+        tab.reloadTab(self.__selectedPath, self.__currentLocation, self.__currentLocationType)
 
     def getInternalControl(self):
+        # the tabs and delegates can ask for it before the editor is first
+        # shown, its caches are only filled when they are used
+        if self.__control is None:
+            self.__control = self.__mainNode.buildInternalControl()
         return self.__control
 
     def __updateCB(self, args):
         try:
             if self.__systemSetValue:
                 return
+            # a manipulator drag finalizes the same parameters many times in
+            # one batch, each parameter is applied once with its last value
+            edits = {}
             for arg in args:
-                if arg[0] not in 'parameter_finalizeValue':
-                    return
+                if arg[0] != 'parameter_finalizeValue':
+                    break
                 node = arg[2].get('node')
                 param = arg[2].get('param')
-                paramName = Helper.stripNodeName(param.getFullName())
-                if paramName.startswith("transform") or paramName.startswith("args"):
-                    self.processXformEdit(param, node)
-                elif paramName.startswith("shaders"):
-                    self.processMaterialEdit(param, node, paramName)
+                head, paramName = Helper.splitNodeName(param.getFullName())
+                if head in self.EDIT_HANDLERS:
+                    edits[(node, paramName)] = (head, param)
                 self.__updateOnIdle = True
+            # applied before returning, so the edit nodes change in the same
+            # undo group as the parameter that was finalized
+            self.__applyEdits(edits)
+            return
+        except:
+            import traceback
+            traceback.print_exc()
+
+    def __applyEdits(self, edits):
+        if not edits:
             return
+        try:
+            for (node, paramName), (head, param) in edits.items():
+                self.EDIT_HANDLERS[head](self, param, node, paramName)
         except:
             import traceback
             traceback.print_exc()
+        finally:
+            # the nodes can be created or deleted before the next batch
+            self.__editNodeRoles = None
+
+    def __getEditNodeRole(self, node):
+        if self.__editNodeRoles is None:
+            mainNode = self.__mainNode
+            roles = {}
+            for role, editNode in (
+                    ("create", mainNode.getLightCreateNode()),
+                    ("create", mainNode.getRigCreateNode()),
+                    ("proxyXform", mainNode.getProxyXformNode()),
+                    ("proxyMaterial", mainNode.getProxyMaterialNode()),
+                    ("proxyMaterial", mainNode.getProxyFilterNode()),
+                    ("proxyDownstreamMaterial", mainNode.getProxyDownstreamMaterialNode())):
+                if editNode is not None:
+                    # keyed on identity, the edit nodes are compared without
+                    # going through the node's __eq__
+                    roles[id(editNode)] = role
+            self.__editNodeRoles = roles
+        return self.__editNodeRoles.get(id(node))
 
     def selectLocations(self, locations):
         replaceSelection = True
         self.__sceneGraphView.selectLocations(locations, replaceSelection)
 
-    def processXformEdit(self, param, node):
+    def processXformEdit(self, param, node, paramName=None):
         if self.__currentLocation and self.__currentLocationType:
-            if node in [self.__mainNode.getLightCreateNode(), self.__mainNode.getRigCreateNode()]:
-                index = self.__control.getIndexForLocation(self.__currentLocation, self.__currentLocationType)
+            role = self.__getEditNodeRole(node)
+            if role == "create":
+                index = self.getInternalControl().getIndexForLocation(self.__currentLocation, self.__currentLocationType)
                 node.setParamAtIndex(param, index)
-            elif node == self.__mainNode.getProxyXformNode():
+            elif role == "proxyXform":
                 self.__mainNode.getDownstreamEditNode().setParamEditForLocation(self.__currentLocation, param, isXform=True)
     
     def processMaterialEdit(self, param, node, paramName):
         if self.__currentLocation and self.__currentLocationType:
-            if node == self.__mainNode.getProxyMaterialNode() or node == self.__mainNode.getProxyFilterNode():
-                if paramName.startswith("shaders.moonrayLightShader") or paramName.startswith("shaders.moonrayLightfilterShader"):
+            role = self.__getEditNodeRole(node)
+            if role == "proxyMaterial":
+                if paramName.partition(".")[2].partition(".")[0] in LIGHT_SHADER_PARAMS:
                     if param.getName()=="value":
-                        self.__control.setMaterialForLocation(self.__currentLocationType, param.getValue(0), self.__currentLocation)
+                        self.getInternalControl().setMaterialForLocation(self.__currentLocationType, param.getValue(0), self.__currentLocation)
                 else:
                     self.__mainNode.getMaterialEditNode().setParamEditForLocation(self.__currentLocation, param)
-            elif node == self.__mainNode.getProxyDownstreamMaterialNode():
+            elif role == "proxyDownstreamMaterial":
                 self.__mainNode.getDownstreamEditNode().setParamEditForLocation(self.__currentLocation, param)
 
+    # the edit handler of each top level parameter, keyed on the first
+    # segment of the parameter name
+    EDIT_HANDLERS = {
+        "transform": processXformEdit,
+        "args": processXformEdit,
+        "shaders": processMaterialEdit,
+    }
+
     '''
     def __idle_callback(self, *args, **kwargs):
         if self.__updateOnIdle:
@@ -782,9 +967,24 @@ class DreamGafferEditor(QtWidgets.QWidget):
     '''
     def showEvent(self, event):
         QtWidgets.QWidget.showEvent(self, event)
+        if not self.__initialized:
+            self.__initialized = True
+            # let the editor paint before the cache and the view are filled
+            QtCore.QTimer.singleShot(0, self.__firstShow)
         if self.__frozen:
             self._thaw()
 
+    def __firstShow(self):
+        try:
+            self.__sceneGraphView.getSceneGraphChildren(self.__lastRootLocation, self.__rootChildrenChangedCallback)
+            self.__sceneGraphView.setLocationActive(self.__lastRootLocation)
+            # update viewed node
+            self.__showIncomingSceneEvent()
+            self.getInternalControl()
+        except:
+            import traceback
+            traceback.print_exc()
+
     def hideEvent(self, event):
         QtWidgets.QWidget.hideEvent(self, event)
         if not self.__frozen:
@@ -796,8 +996,9 @@ class DreamGafferEditor(QtWidgets.QWidget):
             return
         else:
             self.__frozen = False
-            currentRoot = self.__mainNode.getParameter("rootLocation").getValue(0)
-            self.__updateRootLocation(currentRoot)
+            # __updateRootLocation returns early when the root didn't change
+            # while the editor was hidden
+            self.__updateRootLocation(self.__mainNode.getRootLocation())
         
             self.__setupEventHandlers(True)
 
@@ -813,9 +1014,12 @@ class DreamGafferEditor(QtWidgets.QWidget):
         self.__systemSetValue = value
 
     def __setupEventHandlers(self, enabled):
+        if enabled == self.__handlersEnabled:
+            return
+        self.__handlersEnabled = enabled
         #Utils.EventModule.RegisterEventHandler(self.__idle_callback, 'event_idle', enabled=enabled)
         Utils.EventModule.RegisterCollapsedHandler(self.__updateCB, 'parameter_finalizeValue', enabled=enabled)
-        Utils.EventModule.RegisterCollapsedHandler(self.__syncSelectionEvent, 'dreamGaffer_syncOutgoingSelection', hash(self.__mainNode), enabled=enabled)
+        Utils.EventModule.RegisterCollapsedHandler(self.__syncSelectionEvent, 'dreamGaffer_syncOutgoingSelection', self.__mainNodeHash, enabled=enabled)
         Utils.EventModule.RegisterCollapsedHandler(self.__on_scenegraphManager_selectionChanged, 'scenegraphManager_selectionChanged', enabled=enabled)
         Utils.EventModule.RegisterCollapsedHandler(self.__viewerOverrideXformCallback, 'dreamGaffer_viewerOverrideXform', enabled=enabled)
         #Utils.EventModule.RegisterCollapsedHandler(self.__updateCB, 'port_connect', enabled=enabled)
@@ -823,7 +1027,7 @@ class DreamGafferEditor(QtWidgets.QWidget):
     
     def __viewerOverrideXformCallback(self, *args):
         self.objectTab.setDirty(True)
-        if self.__tabWidget.currentWidget() == self.objectTab:
+        if self.__tabWidget.currentWidget() is self.objectTab:
             self.__systemSetValue = True
             self.objectTab.reloadTabForAdoptedLocation(self.__selectedPath, self.__currentLocation, self.__currentLocationType)
             self.__systemSetValue = False
@@ -1,13 +1,47 @@
 # Copyright 2025 DreamWorks Animation LLC
 # SPDX-License-Identifier: Apache-2.0
 
+import os
+
+# set DREAMGAFFER_DEBUG=1 to print the cache state of the DreamGaffer actions
+DEBUG = os.environ.get("DREAMGAFFER_DEBUG") == "1"
+
 def getUnusedName(basename, children):
+    # children can be any collection of names, lists are turned into a set
+    # so each candidate is tested in constant time
+    if not isinstance(children, (set, frozenset, dict)):
+        children = set(children)
     i = 0
     name = basename
     while (name in children):
         i = i + 1
-        name = basename + str(i)
+        name = '%s%d' % (basename, i)
     return name
 
+# parameter names are stripped on every finalized edit, the same few names
+# come back over and over during a drag
+STRIPPED_NAMES = {}
+STRIPPED_NAMES_LIMIT = 4096
+
+def splitNodeName(paramName):
+    # returns the parameter name without the node name and its first
+    # segment, ("transform", "transform.translate") for "node.transform.translate"
+    names = STRIPPED_NAMES.get(paramName)
+    if names is None:
+        idx = paramName.find(".")
+        name = paramName[idx+1:] if idx >= 0 else ""
+        idx = name.find(".")
+        names = (name[:idx] if idx >= 0 else name, name)
+        if len(STRIPPED_NAMES) >= STRIPPED_NAMES_LIMIT:
+            STRIPPED_NAMES.clear()
+        STRIPPED_NAMES[paramName] = names
+    return names
+
 def stripNodeName(paramName):
-    return ".".join(paramName.split(".")[1:])
\ No newline at end of file
+    return splitNodeName(paramName)[1]
+
+def splitPath(path):
+    # parent path and name of a scenegraph location in one scan, the paths
+    # are always "/" separated so os.path isn't needed
+    parentPath, _, name = path.rpartition("/")
+    return parentPath, name
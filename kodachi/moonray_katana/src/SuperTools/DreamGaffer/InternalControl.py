@@ -6,9 +6,9 @@
 #this helps when duplicate upstream lights - we get attributes for upstream locations first and then create locations.
 #for each one, it's worth caching its index so that its faster to retrieve the information.?
 
-import os
 from Katana import Utils, Decorators
 from Cache import *
+import Helper
 '''
 example: 
 light cache for light node..
@@ -21,14 +21,14 @@ light cache and material cache are similar..
 light cache can have light filter ...
 
 
-lights = {"a": {"index": 0, "children": ["b", "c"]}, 
-            "a/b": {"index": 1, "children": ["d"]}, 
-            "a/c":{"index":2, "children": []}
-            "a/b/d": {"index":3, "children": []}}
-materials = {"a": {"index": 0, "children": ["b", "c"]}, 
-            "a/b": {"index": 1, "children": ["d"]}, 
-            "a/c":{"index":2, "children": []}
-            "a/b/d": {"index":3, "children": []}}
+lights = {"a": {"index": 0, "children": {"b": "light", "c": "light"}}, 
+            "a/b": {"index": 1, "children": {"d": "light"}}, 
+            "a/c":{"index":2, "children": {}}
+            "a/b/d": {"index":3, "children": {}}}
+materials = {"a": {"index": 0, "children": {"b": "material", "c": "material"}}, 
+            "a/b": {"index": 1, "children": {"d": "material"}}, 
+            "a/c":{"index":2, "children": {}}
+            "a/b/d": {"index":3, "children": {}}}
 
 rigs = {"a": {"index": 0, "children": {"b": "light", "c": "rig"}}, 
             "a/b": {"index": 1, "children": ["d": "rig"]}, 
@@ -36,6 +36,19 @@ rigs = {"a": {"index": 0, "children": {"b": "light", "c": "rig"}},
             "a/b/d": {"index":3, "children": []}}
 '''
 
+# lights are linked into the rig cache and light filters into the light cache,
+# so these caches are always rebuilt together, rigs first
+LIGHT_LOCATION_TYPES = ("rig", "light", "light filter")
+
+# the location types each DreamGaffer undo group can change, the actions that
+# aren't listed (rename, move, delete, duplicate..) rebuild every cache
+ACTION_LOCATION_TYPES = {
+    "DreamGaffer Add light": LIGHT_LOCATION_TYPES,
+    "DreamGaffer Add rig": LIGHT_LOCATION_TYPES,
+    "DreamGaffer Add filter": LIGHT_LOCATION_TYPES,
+    "DreamGaffer Add material": ("material",),
+}
+
 
 class InternalControl():
     def __init__(self, node):
@@ -44,7 +57,16 @@ class InternalControl():
         self.rigCache = LightRigCache(self, "rig")
         self.materialCache = BaseCache(self, "material")
         self.lightFilterCache = BaseCache(self, "light filter")
-        self.adoptedLocations = []
+        self.cacheByType = {
+            "light": self.lightCache,
+            "rig": self.rigCache,
+            "material": self.materialCache,
+            "light filter": self.lightFilterCache,
+        }
+        # the caches are built the first time their location type is used,
+        # the adopted locations the first time they are asked for
+        self.unbuiltTypes = set()
+        self.adoptedLocations = None
         self.node = node
         self.buildInternalCache()
     
@@ -56,24 +78,19 @@ class InternalControl():
     @Decorators.undogroup('DreamGaffer Move location')
     def move(self, oldLocation, newLocation, locationType, oldParentType, newParentType):
         if oldParentType:
-            #print oldParentType
-            childName = os.path.basename(oldLocation)
-            parentPath = os.path.dirname(oldLocation)
+            parentPath, childName = Helper.splitPath(oldLocation)
             self.getCacheOfLocationType(oldParentType).removeChild(parentPath, childName)
-            #print self.getCacheOfLocationType(oldParentType).cache
         
         if newParentType:
-            #print newParentType
-            newParentPath = os.path.dirname(newLocation)
-            childName = os.path.basename(newLocation)
+            newParentPath, childName = Helper.splitPath(newLocation)
             newParentCache = self.getCacheOfLocationType(newParentType)
             newParentCache.addChildToParent(newParentPath, childName, locationType)
-            #print newParentCache.cache
+            if Helper.DEBUG:
+                print("move %s to %s" % (oldLocation, newLocation))
+                print(newParentCache)
         try:
             self.getCacheOfLocationType(locationType).renameLocation(oldLocation, newLocation)
         except:
-            #print "oldlocation", oldLocation
-            #print "newlocation", newLocation
             import traceback
             traceback.print_exc()
         
@@ -82,6 +99,15 @@ class InternalControl():
         self.node.getMaterialEditNode().renameLocation(location, newLocation)
         # todo: light link..
 
+    def renameLocations(self, renames):
+        # renames is a list of (location, newLocation)
+        node = self.node.getMaterialEditNode()
+        renameLocations = getattr(node, "renameLocations", None)
+        if renameLocations:
+            renameLocations(renames)
+        else:
+            for location, newLocation in renames:
+                node.renameLocation(location, newLocation)
 
     def duplicateSingleLocation(self, location, newLocation):
         self.node.getMaterialEditNode().duplicateLocation(location, newLocation)
@@ -98,14 +124,19 @@ class InternalControl():
         return node
 
     def locationExists(self, location, locationType):
-        if not self.getCacheOfLocationType(locationType):
+        cache = self.getCacheOfLocationType(locationType)
+        if cache is None:
             return False
-        return self.getCacheOfLocationType(locationType).locationExists(location)
+        return cache.locationExists(location)
     
+    def getAdoptedLocations(self):
+        if self.adoptedLocations is None:
+            node = self.node.getDownstreamEditNode()
+            self.adoptedLocations = set(node.getAdoptedLocations()) if node else set()
+        return self.adoptedLocations
+
     def locationAdopted(self, location):
-        if location in self.adoptedLocations:
-            return True
-        return False
+        return location in self.getAdoptedLocations()
 
     def updateSoloForLocation(self, location, locationType):
         if self.locationExists(location, locationType):
@@ -120,9 +151,10 @@ class InternalControl():
             self.node.getDownstreamEditNode().updateMuteForLocation(location)
 
     def getIndexForLocation(self, location, locationType):
-        if not self.getCacheOfLocationType(locationType):
+        cache = self.getCacheOfLocationType(locationType)
+        if cache is None:
             return None
-        return self.getCacheOfLocationType(locationType).getIndexForLocation(location)
+        return cache.getIndexForLocation(location)
 
     def clearCache(self):
         self.rigCache.clearCache()
@@ -131,16 +163,34 @@ class InternalControl():
         self.lightFilterCache.clearCache()
 
     def buildInternalCache(self):
-        # build rig cache first so that we can add light to it...        
-        self.rigCache.buildCache(self.node.getRigCreateNode())
-        self.lightCache.buildCache(self.node.getLightCreateNode())
-        self.lightFilterCache.buildCache(self.node.getLightFilterCreateNode())
-        self.materialCache.buildCache(self.node.getMaterialCreateNode())
-        
-        node = self.node.getDownstreamEditNode()
-        if node:
-            self.adoptedLocations = node.getAdoptedLocations()
+        # the caches are filled when they are first used
+        self.unbuiltTypes.update(self.cacheByType)
+        self.adoptedLocations = None
+
+    def buildCacheOfLocationType(self, locationType):
+        if locationType in LIGHT_LOCATION_TYPES:
+            # build rig cache first so that we can add light to it...
+            locationTypes = [t for t in LIGHT_LOCATION_TYPES if t in self.unbuiltTypes]
+        else:
+            locationTypes = [locationType]
+        # the caches are marked built first, building the light filters
+        # looks up the light cache
+        self.unbuiltTypes.difference_update(locationTypes)
+        for t in locationTypes:
+            self.cacheByType[t].buildCache(self.node.getCreateNodeForLocationType(t))
+
+    def rebuildCacheForAction(self, actionName):
+        # called when a DreamGaffer action is undone or redone, only the
+        # caches the action can have changed are rebuilt
+        locationTypes = ACTION_LOCATION_TYPES.get(actionName)
+        if locationTypes is None:
+            self.clearCache()
+            self.buildInternalCache()
+            return
 
+        for locationType in locationTypes:
+            self.cacheByType[locationType].clearCache()
+        self.unbuiltTypes.update(locationTypes)
 
     def findAndUpdateChildName(self, parentPath, newName, oldName, locationType, parentType=None):
         # inform parent that the child's name has been change..if the location has a parent..
@@ -151,35 +201,57 @@ class InternalControl():
         # we dont know the parent type...
         if locationType == "light":
             # light's parent can be rig or light
-            if not self.lightCache.updateChildName(parentPath, newName, oldName, locationType):
-                self.rigCache.updateChildName(parentPath, newName, oldName, locationType)
+            if not self.getLightCache().updateChildName(parentPath, newName, oldName, locationType):
+                self.getRigCache().updateChildName(parentPath, newName, oldName, locationType)
         elif locationType == "light filter":
             # light filter's parent can be light filter or a light
             if not self.getCacheOfLocationType(locationType).updateChildName(parentPath, newName, oldName, locationType):
-                self.lightCache.updateChildName(parentPath, newName, oldName, locationType)
+                self.getLightCache().updateChildName(parentPath, newName, oldName, locationType)
         else:
             # rig or material's parent is of the same type
             self.getCacheOfLocationType(locationType).updateChildName(parentPath, newName, oldName, locationType)
         
     
     def removeLocation(self, parentPath, location, locationType):
-        name = os.path.basename(location)
+        name = Helper.splitPath(location)[1]
         newName = None
         # remove light from its parent if there is one
         self.findAndUpdateChildName(parentPath, newName, name, locationType)
         self.getCacheOfLocationType(locationType).recursiveRemoveLocation(parentPath, name)
 
+    def removeLocations(self, removals):
+        # removals is a list of (parentPath, location, locationType). a location
+        # the removal of an ancestor of its type already walks to is skipped,
+        # its subtree is removed with the ancestor's
+        removedByType = {}
+        for parentPath, location, locationType in removals:
+            removedByType.setdefault(locationType, set()).add(location)
+
+        topRemovals = []
+        for parentPath, location, locationType in removals:
+            cache = self.getCacheOfLocationType(locationType)
+            removed = removedByType[locationType]
+            ancestor = parentPath
+            while ancestor and ancestor not in removed and cache.locationExists(ancestor):
+                ancestor = Helper.splitPath(ancestor)[0]
+            if not (ancestor in removed and cache.locationExists(ancestor)):
+                topRemovals.append((parentPath, location, locationType))
+
+        for parentPath, location, locationType in topRemovals:
+            self.removeLocation(parentPath, location, locationType)
+
 
     def duplicateLocation(self, srcLocation, locationType):
         try:
-            parentPath = os.path.dirname(srcLocation)
+            parentPath, srcName = Helper.splitPath(srcLocation)
             cache = self.getCacheOfLocationType(locationType)
-            name = cache.getUnusedName(parentPath, os.path.basename(srcLocation))
+            name = cache.getUnusedName(parentPath, srcName)
 
             dstLocation = getLocationPath(parentPath, name)
             oldName = None
             self.findAndUpdateChildName(parentPath, name, oldName, locationType)
-            print "going to duplicate"
+            if Helper.DEBUG:
+                print("duplicate %s to %s" % (srcLocation, dstLocation))
             cache.recursiveDuplicateLocation(srcLocation, dstLocation)
         except:
             import traceback
@@ -214,7 +286,7 @@ class InternalControl():
         return name, index, cache
 
     def editLocation(self, location):
-        self.adoptedLocations.append(location)
+        self.getAdoptedLocations().add(location)
         self.node.getDownstreamEditNode(forceCreate=True).adoptLocation(location)
 
     def setMaterialForLocation(self, locationType, materialValue, location):
@@ -222,26 +294,21 @@ class InternalControl():
         cache.setMaterialForLocation(location, materialValue)
 
     def getAvailableMasterMaterials(self):
-        return self.materialCache.getLocationList()
+        return self.getMaterialCache().getLocationList()
 
     def getCacheOfLocationType(self, locationType):
-        if locationType == "light":
-            return self.lightCache
-        elif locationType == "rig":
-            return self.rigCache
-        elif locationType == "material":
-            return self.materialCache
-        elif locationType == "light filter":
-            return self.lightFilterCache
+        if locationType in self.unbuiltTypes:
+            self.buildCacheOfLocationType(locationType)
+        return self.cacheByType.get(locationType)
 
     def getLightCache(self):
-        return self.lightCache
+        return self.getCacheOfLocationType("light")
     
     def getRigCache(self):
-        return self.rigCache
+        return self.getCacheOfLocationType("rig")
     
     def getMaterialCache(self):
-        return self.materialCache
+        return self.getCacheOfLocationType("material")
     
 
         
@@ -11,6 +11,28 @@ SYNC_SELECTION_OFF = 0.0
 SYNC_SELECTION_OUT = 1.0
 SYNC_SELECTION_IN_OUT = 2.0
 
+# (key, node type, name, input ports, position, referenced) of the nodes every
+# DreamGaffer is built with, a referenced node is found with getRefNode(key)
+INTERNAL_NODES = [
+    ("mergeNew", "Merge", "MergeNew", ("rig", "light", "filter", "material"), (200, 300), True),
+    ("mergeIncoming", "Merge", "MergeIncoming", ("i0", "i1"), (0, 100), True),
+    ("isolate", "Isolate", None, (), (-100, 300), False),
+    ("mergeAll", "Merge", "MergeAll", ("i0", "i1"), (0, -300), True),
+    ("viewNew", "Dot", None, (), (200, 120), True),
+    ("viewIncoming", "Dot", None, (), (0, -100), True),
+]
+
+# (source key, output port index, destination key, input port index) of the
+# connections between those nodes
+INTERNAL_CONNECTIONS = [
+    ("isolate", 0, "mergeIncoming", 0),
+    ("viewNew", 0, "mergeIncoming", 1),
+    ("mergeNew", 0, "viewNew", 0),
+    ("isolate", 1, "mergeAll", 1),
+    ("mergeIncoming", 0, "viewIncoming", 0),
+    ("viewIncoming", 0, "mergeAll", 0),
+]
+
 def GetEditor():
     from Editor import DreamGafferEditor
     return DreamGafferEditor
@@ -39,59 +61,47 @@ class DreamGafferNode(NodegraphAPI.SuperTool):
         if hasattr(self, "internalControl"):
             return self.internalControl
 
+    def getRefNode(self, key):
+        # the referenced nodes are looked up by the name of the last lookup,
+        # the reference parameter is only read again when that node was
+        # renamed, deleted or not created yet
+        if not hasattr(self, "refNodes"):
+            self.refNodes = {}
+        ref = self.refNodes.get(key)
+        if ref is not None and NodegraphAPI.GetNode(ref[0]) is ref[1]:
+            return ref[1]
+        node = SA.GetRefNode(self, key)
+        if node:
+            self.refNodes[key] = (node.getName(), node)
+        else:
+            self.refNodes.pop(key, None)
+        return node
+
     def buildNodes(self):
-        mergeNew = NodegraphAPI.CreateNode("Merge", self)
-        mergeNew.setName("MergeNew")
-        mergeNew.addInputPort("rig") 
-        mergeNew.addInputPort("light")
-        mergeNew.addInputPort("filter")
-        mergeNew.addInputPort("material")
-        SA.AddNodeReferenceParam(self, "mergeNew", mergeNew)
-
-        mergeIncoming = NodegraphAPI.CreateNode("Merge", self)
-        mergeIncoming.setName("MergeIncoming")
-        mergeIncoming.addInputPort("i0")
-        mergeIncoming.addInputPort("i1")
-        SA.AddNodeReferenceParam(self, "mergeIncoming", mergeIncoming)
-
-        isolate = NodegraphAPI.CreateNode("Isolate", self)
+        nodes = {}
+        for key, nodeType, name, inputPorts, position, isRef in INTERNAL_NODES:
+            node = NodegraphAPI.CreateNode(nodeType, self)
+            if name:
+                node.setName(name)
+            for portName in inputPorts:
+                node.addInputPort(portName)
+            NodegraphAPI.SetNodePosition(node, position)
+            if isRef:
+                SA.AddNodeReferenceParam(self, key, node)
+            nodes[key] = node
+
+        isolate = nodes["isolate"]
         isolate.enableSecondaryOutput(True)
         isolate.getParameter("isolateFrom").setValue("/root/world", 0)
         isolate.getParameter("isolateLocations").resizeArray(1)
         isolate.getParameter("isolateLocations.i0").setExpression("=^/rootLocation")
 
-
-        mergeAll = NodegraphAPI.CreateNode("Merge", self)
-        mergeAll.setName("MergeAll")
-        mergeAll.addInputPort("i0")
-        mergeAll.addInputPort("i1")
-        SA.AddNodeReferenceParam(self, "mergeAll", mergeAll)
-
-        isolate.getOutputPortByIndex(0).connect(mergeIncoming.getInputPortByIndex(0)) # the out port 
-        
-        viewNewCreated = NodegraphAPI.CreateNode("Dot", self)
-        viewNewCreated.getOutputPortByIndex(0).connect(mergeIncoming.getInputPortByIndex(1))
-        SA.AddNodeReferenceParam(self, "viewNew", viewNewCreated)
-
-        mergeNew.getOutputPortByIndex(0).connect(viewNewCreated.getInputPortByIndex(0))
-
-
-        isolate.getOutputPortByIndex(1).connect(mergeAll.getInputPortByIndex(1)) 
-
-        viewIncoming = NodegraphAPI.CreateNode("Dot", self)
-        viewIncoming.getInputPortByIndex(0).connect(mergeIncoming.getOutputPortByIndex(0))
-        viewIncoming.getOutputPortByIndex(0).connect(mergeAll.getInputPortByIndex(0))
-        SA.AddNodeReferenceParam(self,  "viewIncoming", viewIncoming)
+        # the nodes are all created before any of them is connected
+        for srcKey, srcIndex, dstKey, dstIndex in INTERNAL_CONNECTIONS:
+            nodes[srcKey].getOutputPortByIndex(srcIndex).connect(nodes[dstKey].getInputPortByIndex(dstIndex))
 
         self.getSendPort("in").connect(isolate.getInputPortByIndex(0))
-        self.getReturnPort("out").connect(mergeAll.getOutputPortByIndex(0))
-        
-        NodegraphAPI.SetNodePosition(isolate, (-100, 300))
-        NodegraphAPI.SetNodePosition(mergeNew, (200, 300))
-        NodegraphAPI.SetNodePosition(viewNewCreated, (200, 120))
-        NodegraphAPI.SetNodePosition(mergeIncoming, (0, 100))
-        NodegraphAPI.SetNodePosition(viewIncoming, (0, -100))
-        NodegraphAPI.SetNodePosition(mergeAll, (0, -300))     
+        self.getReturnPort("out").connect(nodes["mergeAll"].getOutputPortByIndex(0))
 
     def createProxyLightShaderNode(self):
         proxyMatNode = NodegraphAPI.CreateNode("Material", self)
@@ -216,77 +226,77 @@ class DreamGafferNode(NodegraphAPI.SuperTool):
 
 
     def getLightCreateNode(self, forceCreate=False):
-        node = SA.GetRefNode(self, "lightCreate")
+        node = self.getRefNode("lightCreate")
         if not node and forceCreate:
 
             node = self.createLightCreateNode()
         return node
     
     def getRigCreateNode(self, forceCreate=False):
-        node = SA.GetRefNode(self, "rigCreate")
+        node = self.getRefNode("rigCreate")
         if not node and forceCreate:
             node = self.createRigCreateNode()
         return node
 
     def getMaterialCreateNode(self, forceCreate=False):
-        node = SA.GetRefNode(self, "materialCreate")
+        node = self.getRefNode("materialCreate")
         if not node and forceCreate:
             node = self.createMaterialCreateNode()
         return node
 
     def getLightFilterCreateNode(self, forceCreate=False):
-        node = SA.GetRefNode(self, "lgtFilterCreate")
+        node = self.getRefNode("lgtFilterCreate")
         if not node and forceCreate:
             node = self.createLgtFilterCreateNode()
         return node
     
     def getMaterialEditNode(self, forceCreate=False):
-        node = SA.GetRefNode(self, "materialEdit")
+        node = self.getRefNode("materialEdit")
         if not node and forceCreate:
             node = self.createMaterialEditNode()
         return node
 
     def getDownstreamEditNode(self, forceCreate=False):
-        node = SA.GetRefNode(self, "downstreamEdit")
+        node = self.getRefNode("downstreamEdit")
         if not node and forceCreate:
             node = self.createDownstreamEditNode()
         return node
 
     def getProxyMaterialNode(self, forceCreate=False):
-        node = SA.GetRefNode(self, "proxyLightShader")
+        node = self.getRefNode("proxyLightShader")
         if not node and forceCreate:
             node = self.createProxyLightShaderNode()
         return node 
 
     def getProxyFilterNode(self, forceCreate=False):
-        node = SA.GetRefNode(self, "proxyLightFilter")
+        node = self.getRefNode("proxyLightFilter")
         if not node and forceCreate:
             node = self.createProxyLightFilterNode()
         return node
     
     def getProxyXformNode(self, forceCreate=False):
-        node = SA.GetRefNode(self, "proxyTransform")
+        node = self.getRefNode("proxyTransform")
         if not node and forceCreate:
             node = self.createProxyXformNode()
         return node
 
     def getProxyDownstreamMaterialNode(self, forceCreate=False):
-        node = SA.GetRefNode(self, "proxyMaterialEdit")
+        node = self.getRefNode("proxyMaterialEdit")
         if not node and forceCreate:
             node = self.createProxyMaterialEdit()
         return node
 
     def getMergeIncomingNode(self):
-        return SA.GetRefNode(self, "mergeIncoming")
+        return self.getRefNode("mergeIncoming")
     
     def getViewIncomingNode(self):
-        return SA.GetRefNode(self, "viewIncoming")
+        return self.getRefNode("viewIncoming")
 
     def getMergeNewNode(self):
-        return SA.GetRefNode(self, "mergeNew")
+        return self.getRefNode("mergeNew")
     
     def getViewNewNode(self):
-        return SA.GetRefNode(self, "viewNew")
+        return self.getRefNode("viewNew")
 
     def getRootLocation(self):
         return self.getParameter("rootLocation").getValue(0)
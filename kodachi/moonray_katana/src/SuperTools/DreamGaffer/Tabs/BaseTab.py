@@ -3,6 +3,15 @@
 
 from Katana import QtWidgets, UI4, Utils
 
+# looked up the first time a tab builds a parameter widget
+WIDGET_FACTORY = None
+
+def getWidgetFactory():
+    global WIDGET_FACTORY
+    if WIDGET_FACTORY is None:
+        WIDGET_FACTORY = UI4.FormMaster.KatanaFactory.ParameterWidgetFactory
+    return WIDGET_FACTORY
+
 class BaseTab(QtWidgets.QWidget):
     def __init__(self, parent, node):
         QtWidgets.QWidget.__init__(self, parent)
@@ -14,15 +14,21 @@ class FilterTab(BaseTab):
         if not self.dirty:
             return
         if locationType in ["light filter"]:
+            # the cache maps the location to its index, the material is then
+            # read by index instead of by parameter name
             index = self.editor.getInternalControl().getIndexForLocation(location, locationType)
-            material = self.node.getCreateNodeForLocationType(locationType).getParameter("material.i"+str(index)).getValue(0)
-            self.node.getProxyFilterNode().getParameter('edit.location').setValue(fullpath, 0)
+            if index is None:
+                return
+            createNode = self.node.getCreateNodeForLocationType(locationType)
+            material = createNode.getParameter("material").getChildByIndex(index).getValue(0)
+            proxyFilterNode = self.node.getProxyFilterNode()
+            proxyFilterNode.getParameter('edit.location').setValue(fullpath, 0)
             if material == "":
                 # show parent's light material
-                self.node.getProxyFilterNode().getParameter("shaders.moonrayLightFilterShader.enable").setValue(0, 0)
+                proxyFilterNode.getParameter("shaders.moonrayLightFilterShader.enable").setValue(0, 0)
             else:
-                self.node.getProxyFilterNode().getParameter("shaders.moonrayLightFilterShader.enable").setValue(1, 0)
-                self.node.getProxyFilterNode().getParameter("shaders.moonrayLightFilterShader.value").setValue(material, 0)
+                proxyFilterNode.getParameter("shaders.moonrayLightFilterShader.enable").setValue(1, 0)
+                proxyFilterNode.getParameter("shaders.moonrayLightFilterShader.value").setValue(material, 0)
             self.loadLightFilterWidget()
         elif locationType == "light":
             ""
@@ -43,7 +49,7 @@ class FilterTab(BaseTab):
 
 
     def createLightFilterWidget(self):
-        factory = UI4.FormMaster.KatanaFactory.ParameterWidgetFactory
+        factory = getWidgetFactory()
         proxyFilter = self.node.getProxyFilterNode()
         param = proxyFilter.getParameter("shaders")
         policy = UI4.FormMaster.CreateParameterPolicy(None, param)
@@ -11,6 +11,9 @@ class MaterialTab(BaseTab):
         self.lightShaderWidget = None
         self.lightFilterWidget = None
         self.materialEditWidget = None
+        # the proxy parameters looked up while loading the edits of a
+        # location, keyed on (node id, parameter name)
+        self.proxyParams = {}
 
     def hideAllWidgets(self):
         if self.lightFilterWidget:
@@ -27,20 +30,21 @@ class MaterialTab(BaseTab):
         if not shaderType:
             return
     
-        materialName = self.node.getCreateNodeForLocationType(locationType).getParameter("material.i"+str(index)).getValue(0)
+        createNode = self.node.getCreateNodeForLocationType(locationType)
+        materialName = createNode.getParameter("material").getChildByIndex(index).getValue(0)
         proxyNode = self.getProxyNodeOfLocationType(locationType)
         proxyNode.getParameter('edit.location').setValue(fullpath, 0)
+        shaderParam = proxyNode.getParameter("shaders." + shaderType)
         if materialName == "" or materialName.startswith("../"):
             # show parent's light material
-            proxyNode.getParameter("shaders.%s.enable"%shaderType).setValue(0, 0)
+            shaderParam.getChild("enable").setValue(0, 0)
         else:
-            proxyNode.getParameter("shaders.%s.enable"%shaderType).setValue(1, 0)
-            proxyNode.getParameter("shaders.%s.value"%shaderType).setValue(materialName, 0)
+            shaderParam.getChild("enable").setValue(1, 0)
+            shaderParam.getChild("value").setValue(materialName, 0)
         
         widget = self.getWidgetOfLocationType(locationType)
         self.loadEditsForLocation(location, locationType)
         widget.show()
-        #Utils.EventModule.ProcessAllEvents()
 
     def reloadTabForAdoptedLocation(self, fullpath, location, locationType):
         #print "reloadTabForAdoptedLocation"
@@ -50,8 +54,6 @@ class MaterialTab(BaseTab):
         widget = self.getMaterialEditWidget()
         self.loadEditsForLocation(location, locationType, isAdopted=True)
         widget.show()
-        #Utils.EventModule.ProcessAllEvents()
-        #Utils.EventModule.ProcessAllEvents()
 
 
 
@@ -84,6 +86,19 @@ class MaterialTab(BaseTab):
         
 
     
+    def getProxyParameter(self, node, paramName):
+        key = (id(node), paramName)
+        try:
+            return self.proxyParams[key]
+        except KeyError:
+            param = self.proxyParams[key] = node.getParameter(paramName)
+            return param
+
+    def checkDynamicParameters(self, node):
+        # the parameters of the node can change, look them up again
+        node.checkDynamicParameters()
+        self.proxyParams.clear()
+
     def resetProxyWidget(self, isAdopted):
         if not self.currentLocation:
             return
@@ -99,9 +114,9 @@ class MaterialTab(BaseTab):
                 if param.startswith("attributeEditor"):
                     continue
                 param = param.replace("material", "shaders", 1)
-                enableParam = param + ".enable"
-                if proxyMaterialNode.getParameter(enableParam):
-                    proxyMaterialNode.getParameter(enableParam).setValue(0, 0)
+                enableParam = self.getProxyParameter(proxyMaterialNode, param + ".enable")
+                if enableParam:
+                    enableParam.setValue(0, 0)
                
 
         
@@ -113,7 +128,7 @@ class MaterialTab(BaseTab):
                     if paramName.startswith("xform") or paramName == "location.dwa":
                         continue
                     paramName = paramName.replace("material", "shaders", 1)
-                    param = proxyMaterialNode.getParameter(paramName+".value")
+                    param = self.getProxyParameter(proxyMaterialNode, paramName+".value")
                     param.setExpressionFlag(False)
                     param.makeConstant(0)
                 except:
@@ -123,6 +138,15 @@ class MaterialTab(BaseTab):
 
 
     def loadEditsForLocation(self, location, locationType, isAdopted=False):
+        # the proxy parameters are all set before the panel repaints
+        self.mainPanel.setUpdatesEnabled(False)
+        try:
+            self.loadEdits(location, locationType, isAdopted)
+        finally:
+            self.mainPanel.setUpdatesEnabled(True)
+            self.proxyParams.clear()
+
+    def loadEdits(self, location, locationType, isAdopted):
         proxyMaterialNode = self.getProxyNodeOfLocationType(locationType)
         materialEditNode = self.node.getMaterialEditNode()
         if isAdopted:
@@ -134,6 +158,9 @@ class MaterialTab(BaseTab):
         edits = materialEditNode.getParamEditsForLocation(location)
 
         if edits:
+            # the dynamic parameters are checked at most once per load, an
+            # edit whose parameter is missing after that has none
+            dynamicParametersChecked = False
             for param, info in edits.iteritems():
                 if param.startswith("attributeEditor"):
                     continue
@@ -145,16 +172,21 @@ class MaterialTab(BaseTab):
                         if childParam == "value":
                             #print childParam, value
                             if isinstance(value, list):
+                                valuePrefix = param + ".value.i"
                                 for i, v in enumerate(value):
-                                    paramName = param + "." + childParam + ".i"+str(i)
-                                    if proxyMaterialNode.getParameter(paramName):
-                                        proxyMaterialNode.getParameter(paramName).setValue(v, 0)
+                                    valueParam = self.getProxyParameter(proxyMaterialNode, valuePrefix + str(i))
+                                    if valueParam:
+                                        valueParam.setValue(v, 0)
                                 continue
-                        if not proxyMaterialNode.getParameter(param):
-                            proxyMaterialNode.checkDynamicParameters()
-                        if proxyMaterialNode.getParameter(param):
-                            if proxyMaterialNode.getParameter(param).getChild(childParam):
-                                proxyMaterialNode.getParameter(param).getChild(childParam).setValue(value, 0)
+                        proxyParam = self.getProxyParameter(proxyMaterialNode, param)
+                        if not proxyParam and not dynamicParametersChecked:
+                            dynamicParametersChecked = True
+                            self.checkDynamicParameters(proxyMaterialNode)
+                            proxyParam = self.getProxyParameter(proxyMaterialNode, param)
+                        if proxyParam:
+                            proxyChild = proxyParam.getChild(childParam)
+                            if proxyChild:
+                                proxyChild.setValue(value, 0)
                     except:
                         import traceback
                         traceback.print_exc()
@@ -168,14 +200,14 @@ class MaterialTab(BaseTab):
                 if paramName.startswith("xform") or paramName == "location.dwa":
                     continue
                 paramName = paramName.replace("material", "shaders", 1)
-                dstParam = proxyMaterialNode.getParameter(paramName+".value")
+                dstParam = self.getProxyParameter(proxyMaterialNode, paramName+".value")
                 copyParamToParam(srcParam, dstParam)
                 
         self.currentLocation = location
         self.currentLocationType = locationType
 
     def createLightShaderWidget(self):
-        factory = UI4.FormMaster.KatanaFactory.ParameterWidgetFactory
+        factory = getWidgetFactory()
         proxyMat = self.node.getProxyMaterialNode(forceCreate=True)
         param = proxyMat.getParameter("shaders")
         policy = UI4.FormMaster.CreateParameterPolicy(None, param)
@@ -184,7 +216,7 @@ class MaterialTab(BaseTab):
 
 
     def createLightFilterWidget(self):
-        factory = UI4.FormMaster.KatanaFactory.ParameterWidgetFactory
+        factory = getWidgetFactory()
         proxyFilter = self.node.getProxyFilterNode(forceCreate=True)
         param = proxyFilter.getParameter("shaders")
         policy = UI4.FormMaster.CreateParameterPolicy(None, param)
@@ -192,7 +224,7 @@ class MaterialTab(BaseTab):
         self.mainPanel.layout().addWidget(self.lightFilterWidget, 1, 0) 
     
     def createMaterialEditWidget(self):
-        factory = UI4.FormMaster.KatanaFactory.ParameterWidgetFactory
+        factory = getWidgetFactory()
         proxyNode = self.node.getProxyDownstreamMaterialNode()
         param = proxyNode.getParameter("shaders")
         policy = UI4.FormMaster.CreateParameterPolicy(None, param)
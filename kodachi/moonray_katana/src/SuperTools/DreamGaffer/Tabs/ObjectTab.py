@@ -4,6 +4,32 @@
 from Katana import QtWidgets, UI4, Utils
 from BaseTab import *
 
+# the interactive xform edits are shown by the args.xform proxy parameters
+XFORM_PARAM_PREFIX = "xform.interactive"
+PROXY_XFORM_PARAM_PREFIX = "args.xform"
+
+# the sparse edits the object tab doesn't show
+SKIPPED_SPARSE_PREFIXES = ("material",)
+SKIPPED_SPARSE_NAMES = frozenset(["location.dwa"])
+
+# proxy parameter name of each sparse edit name, "" for the skipped ones
+SPARSE_PROXY_NAMES = {}
+
+def getProxyParamName(paramName):
+    if paramName.startswith(XFORM_PARAM_PREFIX):
+        return PROXY_XFORM_PARAM_PREFIX + paramName[len(XFORM_PARAM_PREFIX):]
+    return paramName
+
+def getSparseProxyParamName(editName):
+    name = SPARSE_PROXY_NAMES.get(editName)
+    if name is None:
+        paramName = editName.replace("_", ".")
+        if paramName in SKIPPED_SPARSE_NAMES or paramName.startswith(SKIPPED_SPARSE_PREFIXES):
+            name = ""
+        else:
+            name = getProxyParamName(paramName) + ".value"
+        SPARSE_PROXY_NAMES[editName] = name
+    return name
 
 class ObjectTab(BaseTab):
     def __init__(self, parent, node):
@@ -37,29 +63,29 @@ class ObjectTab(BaseTab):
         widget.show()
         self.loadEditsForLocation(location, locationType)
 
-    def resetProxyWidget(self):
+    def resetProxyWidget(self, proxyNode=None, editNode=None):
         if not self.currentLocation:
             return
 
-        proxyNode = self.node.getProxyXformNode()
-        editNode = self.node.getDownstreamEditNode()
+        if proxyNode is None:
+            proxyNode = self.node.getProxyXformNode()
+        if editNode is None:
+            editNode = self.node.getDownstreamEditNode()
         edits = editNode.getParamEditsForLocation(self.currentLocation, isXformParam=True)
         if edits:
-            for param, info in edits.iteritems():
+            for param in edits:
                 if param.startswith("attributeEditor"):
                     continue
-                param = param.replace("xform.interactive", "args.xform", 1)
-                proxyNode.getParameter(param).getChild("enable").setValue(0, 0)
+                proxyNode.getParameter(getProxyParamName(param)).getChild("enable").setValue(0, 0)
 
         
         sparseEdits = editNode.getSparseEditsForLocation(self.currentLocation)
         if sparseEdits:
             for edit in sparseEdits.getChildren():
-                paramName = edit.getName().replace("_", ".")
-                if paramName.startswith("material") or paramName == "location.dwa":
+                paramName = getSparseProxyParamName(edit.getName())
+                if not paramName:
                     continue
-                paramName = paramName.replace("xform.interactive", "args.xform", 1)
-                param = proxyNode.getParameter(paramName+".value")
+                param = proxyNode.getParameter(paramName)
                 param.setExpressionFlag(False)
                 param.makeConstant(0)
         
@@ -69,31 +95,29 @@ class ObjectTab(BaseTab):
         editNode = self.node.getDownstreamEditNode()
         
         # reset first..
-        self.resetProxyWidget()
+        self.resetProxyWidget(proxyNode, editNode)
         
         edits = editNode.getParamEditsForLocation(location, isXformParam=True)
 
         if edits:
-            for param, info in edits.iteritems():
+            for param, info in edits.items():
                 if param.startswith("attributeEditor"):
                     continue
-                param = param.replace("xform.interactive", "args.xform", 1)
-                #print "param:", param
-                for childParam, value in info.iteritems():
+                dstParam = proxyNode.getParameter(getProxyParamName(param))
+                for childParam, value in info.items():
                     if childParam == "type":
                         continue
-                    proxyNode.getParameter(param).getChild(childParam).setValue(value, 0)
+                    dstParam.getChild(childParam).setValue(value, 0)
         
         
         # load sparse edits.. 
         sparseEdits = editNode.getSparseEditsForLocation(location)
         if sparseEdits:
             for srcParam in sparseEdits.getChildren():
-                paramName = srcParam.getName().replace("_", ".")
-                if paramName.startswith("material") or paramName == "location.dwa":
+                paramName = getSparseProxyParamName(srcParam.getName())
+                if not paramName:
                     continue
-                paramName = paramName.replace("xform.interactive", "args.xform", 1)
-                dstParam = proxyNode.getParameter(paramName+".value")
+                dstParam = proxyNode.getParameter(paramName)
                 copyParamToParam(srcParam, dstParam)
              
         self.currentLocation = location
@@ -127,7 +151,7 @@ class ObjectTab(BaseTab):
         '''
 
     def createLgtXformWidget(self):
-        factory = UI4.FormMaster.KatanaFactory.ParameterWidgetFactory
+        factory = getWidgetFactory()
         lgtNode = self.node.getLightCreateNode()
         param = lgtNode.getParameter("transform")
         policy = UI4.FormMaster.CreateParameterPolicy(None, param)
@@ -136,7 +160,7 @@ class ObjectTab(BaseTab):
 
 
     def createRigXformWidget(self):
-        factory = UI4.FormMaster.KatanaFactory.ParameterWidgetFactory
+        factory = getWidgetFactory()
         rigNode = self.node.getRigCreateNode()
         param = rigNode.getParameter("transform")
         policy = UI4.FormMaster.CreateParameterPolicy(None, param)
@@ -150,11 +174,12 @@ class ObjectTab(BaseTab):
         policy.addChildPolicy(childPolicy)
         '''
         try:
-            factory = UI4.FormMaster.KatanaFactory.ParameterWidgetFactory
+            factory = getWidgetFactory()
             node = self.node.getProxyXformNode()
             param = node.getParameter("args")
             if not param:
                 node.checkDynamicParameters()
+                param = node.getParameter("args")
             policy = UI4.FormMaster.CreateParameterPolicy(None, param)
             self.proxyXformWidget = factory.buildWidget(self, policy)
             self.mainPanel.layout().addWidget(self.proxyXformWidget, 2, 0)
@@ -96,6 +96,7 @@ if PackageSuperToolAPI.IsUIMode():
         def getMaterialPolicy(cls, package):
             packageNode = package.getPackageNode()
             materialNode = NU.GetRefNode(packageNode, "material")
+            materialPolicy = None
             if materialNode is not None:
                 # Light filters don't populate themselves automatically
                 # like lights do, for some reason.